@@ -22,10 +22,14 @@ import time
 import random
 import os
 import collections
+import functools
+import itertools
+import heapq
+import array
 import argparse
 import sys
 import traceback
-import math # For size calculations
+import math # For maze sizing (sqrt)
 
 # --- Constants ---
 
@@ -48,8 +52,7 @@ POWERUP_NAMES = {
     1: "Multi-Food & Slowdown", 2: "Bouncing Balls", 3: "Thick Snake", 4: "MAX SPEED",
     5: "Enemy Snake", 6: "Obstacle Blocks", 7: "Meteor Rain", 8: "Wide Maze" # Updated name
 }
-POWERUP_TYPES = list(POWERUP_NAMES.keys())
-POWERUP_SYMBOLS = {ptype: UNIFIED_POWERUP_SYMBOL for ptype in POWERUP_TYPES}
+POWERUP_TYPES = tuple(POWERUP_NAMES) # Every pickup is drawn as UNIFIED_POWERUP_SYMBOL
 
 
 # Speed & Timing Configuration
@@ -91,11 +94,26 @@ POWERUP_DURATIONS = {
     5: lambda: 30, 6: lambda: 60, 7: lambda: 7,
     8: {"1": 30, "2": 45, "3": 60}
 }
-TIMED_EFFECTS_TO_DISPLAY = {1, 2, 3, 4, 5, 7, 8}
+TIMED_EFFECTS_TO_DISPLAY = frozenset({1, 2, 3, 4, 5, 7, 8})
+TIMEOUT_MODIFYING_EFFECTS = frozenset({1, 4, 8}) # Store 'original_timeout' and restore it on expiry
 
 # Power-up Specific Consts (Unchanged)
 BALL_MAX_SPEED = 1; ENEMY_RANDOM_MOVE_CHANCE = 0.20; ENEMY_INTERNAL_TIMEOUT = 15
-MAX_OBSTACLE_PLACEMENT_ATTEMPTS = 100
+ENEMY_ROUTE_REFRESH_TICKS = 8 # Recompute the enemy's maze route every N enemy moves
+# Enemy wobble moves: perpendicular to a horizontal / vertical ideal move, or any direction
+ENEMY_WOBBLES_H = ((0, 1), (0, -1)); ENEMY_WOBBLES_V = ((1, 0), (-1, 0))
+ENEMY_WOBBLES_ANY = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+# Occupancy Bitmap Bits (one byte per screen cell plus a one-cell OCC_BORDER ring,
+# index (y + 1) * (width + 2) + x + 1, see occupancy_index)
+OCC_MAZE_WALL = 1; OCC_OBSTACLE = 2; OCC_FOOD = 4; OCC_MAZE_FOOD = 8; OCC_POWERUP = 16; OCC_BORDER = 32
+OCC_DEADLY = OCC_MAZE_WALL | OCC_OBSTACLE | OCC_BORDER
+
+# Player Snake Step Results (see step_snake)
+STEP_MOVED = 0; STEP_ATE = 1; STEP_DIED = 2; STEP_ATE_MAZE = 3
+DIRECTION_DELTAS = {curses.KEY_RIGHT: (1, 0), curses.KEY_LEFT: (-1, 0), curses.KEY_UP: (0, -1), curses.KEY_DOWN: (0, 1)}
+OPPOSITE_DIRECTIONS = {curses.KEY_RIGHT: curses.KEY_LEFT, curses.KEY_LEFT: curses.KEY_RIGHT,
+                       curses.KEY_UP: curses.KEY_DOWN, curses.KEY_DOWN: curses.KEY_UP}
 
 # Score Constants (Unchanged)
 SCORE_FOOD = 10; SCORE_MAZE_FOOD = 15; SCORE_POWERUP = 25; SCORE_ENEMY_HEAD = 100
@@ -107,6 +125,151 @@ type1_food_spawn_count = 0; last_type1_decrement_time = 0
 key_press_history = collections.deque(maxlen=3); maze_food_items = []; foods = []
 power_ups_on_screen = []; score = 0; flash_message = None; flash_message_end_time = 0
 maze_just_activated = False
+active_effect_counts = collections.Counter() # Effect type -> number of entries in active_effects
+tick_time = 0.0 # time.monotonic() sampled once at the start of each game tick
+occupancy_grid = bytearray(); occupancy_w = 0; occupancy_h = 0; occupancy_stride = 0
+frame_chars = bytearray(); frame_attrs = []; frame_w = 0; frame_h = 0
+flushed_chars = bytearray(); flushed_attrs = []
+# Curses attributes per screen element, resolved once by init_attrs()
+ATTR_DEFAULT = ATTR_FOOD = ATTR_MAZE_FOOD = ATTR_MAZE_WALL = ATTR_OBSTACLE = ATTR_METEOR = 0
+ATTR_BALL = ATTR_ENEMY = ATTR_SNAKE_FLASH = ATTR_SNAKE_MAZE = ATTR_FLASH_MESSAGE = 0
+POWERUP_ATTRS = {} # Power-up type -> attribute for its '?' pickup
+
+
+# --- Snake Body ---
+class SnakeBody(collections.deque):
+    """Deque of (x, y) segments (head first) with O(1) membership tests.
+
+    A Counter of positions is kept in step by the mutators the game uses
+    (appendleft/append/extend, pop/popleft, clear); counts rather than a set
+    because absorbed enemy segments can overlap the player's own.
+    """
+    def __init__(self, segments=()):
+        super().__init__(segments); self.cells = collections.Counter(self)
+
+    def __contains__(self, pos): return pos in self.cells
+
+    def _drop(self, pos):
+        if self.cells[pos] > 1: self.cells[pos] -= 1
+        else: del self.cells[pos]
+        return pos
+
+    def appendleft(self, pos): super().appendleft(pos); self.cells[pos] += 1
+    def append(self, pos): super().append(pos); self.cells[pos] += 1
+    def extend(self, segments):
+        segments = list(segments); super().extend(segments); self.cells.update(segments)
+    def pop(self): return self._drop(super().pop())
+    def popleft(self): return self._drop(super().popleft())
+    def clear(self): super().clear(); self.cells.clear()
+
+    def shed(self, count):
+        """Drops up to count tail segments, never the head."""
+        for _ in range(min(count, len(self) - 1)): self.pop()
+
+
+# --- Occupancy Bitmap ---
+def init_occupancy(sh, sw):
+    """Allocates an empty occupancy bitmap for the sh x sw screen.
+
+    The screen is surrounded by a ring of OCC_BORDER cells, so anything one step
+    off-screen can be looked up without a separate bounds check.
+    """
+    global occupancy_grid, occupancy_w, occupancy_h, occupancy_stride
+    occupancy_w = sw; occupancy_h = sh; occupancy_stride = sw + 2
+    border = bytes((OCC_BORDER,))
+    occupancy_grid = bytearray(border * occupancy_stride) # Top border row
+    occupancy_grid += (border + bytes(sw) + border) * sh
+    occupancy_grid += border * occupancy_stride # Bottom border row
+
+def occupancy_index(x, y):
+    """Index of screen cell (x, y) in the padded bitmap (valid for -1..w, -1..h)."""
+    return (y + 1) * occupancy_stride + x + 1
+
+def occupy(cells, bit):
+    """Sets bit for every on-screen (x, y) in cells."""
+    grid = occupancy_grid; w = occupancy_w; h = occupancy_h; stride = occupancy_stride
+    for x, y in cells:
+        if 0 <= x < w and 0 <= y < h: grid[(y + 1) * stride + x + 1] |= bit
+
+def vacate(cells, bit):
+    """Clears bit for every on-screen (x, y) in cells."""
+    grid = occupancy_grid; w = occupancy_w; h = occupancy_h; stride = occupancy_stride; keep = ~bit & 0xFF
+    for x, y in cells:
+        if 0 <= x < w and 0 <= y < h: grid[(y + 1) * stride + x + 1] &= keep
+
+def occupy_effect(effect):
+    """Flags the static cells owned by an effect (obstacle blocks, maze walls)."""
+    if effect['type'] == 6: occupy(effect['data'].get('blocks', ()), OCC_OBSTACLE)
+    elif effect['type'] == 8: occupy(effect['data'].get('maze_walls', ()), OCC_MAZE_WALL)
+
+def vacate_effect(effect):
+    """Clears the static cells owned by an effect when it expires."""
+    if effect['type'] == 6: vacate(effect['data'].get('blocks', ()), OCC_OBSTACLE)
+    elif effect['type'] == 8: vacate(effect['data'].get('maze_walls', ()), OCC_MAZE_WALL)
+
+def occupancy_at(x, y):
+    """Returns the occupancy bits at (x, y); anything off-screen reads as OCC_BORDER."""
+    if -1 <= x <= occupancy_w and -1 <= y <= occupancy_h: return occupancy_grid[occupancy_index(x, y)]
+    return OCC_BORDER
+
+
+# --- Frame Buffer ---
+# Each frame is composed into a flat character buffer with a parallel list of
+# curses attributes. A copy of the last flushed frame is kept so each flush only
+# writes the cells that changed, one addstr per run of equal attributes.
+def init_frame(sh, sw):
+    """Allocates a blank sh x sw frame and forces a full redraw on the next flush."""
+    global frame_chars, frame_attrs, frame_w, frame_h, flushed_chars, flushed_attrs
+    frame_chars = bytearray(b' ') * (sh * sw); frame_attrs = [0] * (sh * sw)
+    frame_w = sw; frame_h = sh
+    flushed_chars = bytearray(sh * sw); flushed_attrs = [0] * (sh * sw) # NUL never matches a drawn cell
+
+def frame_invalidate():
+    """Forgets what is on the terminal (call after drawing around the buffer)."""
+    flushed_chars[:] = bytes(len(flushed_chars))
+
+def frame_clear():
+    """Blanks the frame buffer."""
+    frame_chars[:] = b' ' * len(frame_chars); frame_attrs[:] = [0] * len(frame_attrs)
+
+def frame_put(y, x, ch, attr=0):
+    """Buffers one character at (y, x); off-screen cells are ignored."""
+    if 0 <= y < frame_h and 0 <= x < frame_w:
+        i = y * frame_w + x; frame_chars[i] = ord(ch); frame_attrs[i] = attr
+
+def frame_text(y, x, text, attr=0):
+    """Buffers a string starting at (y, x), clipped to the screen width."""
+    if not 0 <= y < frame_h or x >= frame_w: return
+    if x < 0: text = text[-x:]; x = 0
+    data = text[:frame_w - x].encode('ascii', 'replace')
+    i = y * frame_w + x
+    frame_chars[i:i + len(data)] = data; frame_attrs[i:i + len(data)] = [attr] * len(data)
+
+def frame_flush(stdscr):
+    """Writes the cells that changed since the last flush to the window. Returns True if any did."""
+    w = frame_w; chars = frame_chars; attrs = frame_attrs
+    old_chars = flushed_chars; old_attrs = flushed_attrs
+    changed = False
+    for y in range(frame_h):
+        start = y * w; end = start + w
+        if chars[start:end] == old_chars[start:end] and attrs[start:end] == old_attrs[start:end]: continue
+        changed = True
+        # addstr can't write the bottom-right cell (the cursor has nowhere to go)
+        run_limit = end - 1 if y == frame_h - 1 else end
+        i = start
+        while i < end:
+            if chars[i] == old_chars[i] and attrs[i] == old_attrs[i]: i += 1; continue
+            if i == run_limit:
+                try: stdscr.addch(y, i - start, chars[i], attrs[i])
+                except curses.error: pass
+                i += 1; continue
+            # Extend the run over consecutive changed cells sharing an attribute
+            run_start = i; attr = attrs[i]; i += 1
+            while i < run_limit and attrs[i] == attr and (chars[i] != old_chars[i] or attr != old_attrs[i]): i += 1
+            try: stdscr.addstr(y, run_start - start, chars[run_start:i].decode(), attr)
+            except curses.error: pass
+        old_chars[start:end] = chars[start:end]; old_attrs[start:end] = attrs[start:end]
+    return changed
 
 
 # --- High Score Functions --- (Unchanged)
@@ -115,27 +278,26 @@ def load_high_scores():
     scores_list = []
     if not os.path.exists(HIGHSCORE_FILE): return []
     try:
-        with open(HIGHSCORE_FILE, "r") as f:
-            for line in f:
-                line = line.strip();
-                if not line: continue
-                parts = line.split(',', 1)
-                if len(parts) == 2 and parts[0].isdigit():
-                    loaded_score = int(parts[0])
-                    name = parts[1][:MAX_NAME_LENGTH]
-                    scores_list.append((loaded_score, name))
-            return sorted(scores_list, key=lambda item: item[0], reverse=True)[:MAX_HIGH_SCORES]
+        with open(HIGHSCORE_FILE, "r") as f: lines = f.read().splitlines() # Single read
+        for line in lines:
+            line = line.strip();
+            if not line: continue
+            parts = line.split(',', 1)
+            if len(parts) == 2 and parts[0].isdigit():
+                loaded_score = int(parts[0])
+                name = parts[1][:MAX_NAME_LENGTH]
+                scores_list.append((loaded_score, name))
+        return heapq.nlargest(MAX_HIGH_SCORES, scores_list, key=lambda item: item[0])
     except (IOError, ValueError, PermissionError) as e: print(f"Error loading high scores: {e}", file=sys.stderr); return []
     except Exception as e: print(f"Unexpected error loading high scores: {e}", file=sys.stderr); traceback.print_exc(file=sys.stderr); return []
 
 def save_high_scores(scores_list):
     """Saves high scores to file."""
     try:
-        sorted_scores = sorted(scores_list, key=lambda item: item[0], reverse=True)[:MAX_HIGH_SCORES]
-        with open(HIGHSCORE_FILE, "w") as f:
-            for hs_score, name in sorted_scores:
-                safe_name = str(name).replace(',', '')[:MAX_NAME_LENGTH]
-                f.write(f"{hs_score},{safe_name}\n")
+        sorted_scores = heapq.nlargest(MAX_HIGH_SCORES, scores_list, key=lambda item: item[0])
+        # Build the whole file first so it goes out in a single write
+        payload = "".join(f"{hs_score},{str(name).replace(',', '')[:MAX_NAME_LENGTH]}\n" for hs_score, name in sorted_scores)
+        with open(HIGHSCORE_FILE, "w") as f: f.write(payload)
     except (IOError, PermissionError) as e: print(f"Error saving high scores: {e}", file=sys.stderr)
     except Exception as e: print(f"Unexpected error saving high scores: {e}", file=sys.stderr); traceback.print_exc(file=sys.stderr)
 
@@ -197,6 +359,20 @@ def init_colors():
             print(f"Warning: Failed to initialize some/all color pairs: {e}", file=sys.stderr); return False
     return False
 
+def init_attrs(has_colors):
+    """Resolves the color pairs into curses attributes once, instead of every frame."""
+    global ATTR_DEFAULT, ATTR_FOOD, ATTR_MAZE_FOOD, ATTR_MAZE_WALL, ATTR_OBSTACLE, ATTR_METEOR
+    global ATTR_BALL, ATTR_ENEMY, ATTR_SNAKE_FLASH, ATTR_SNAKE_MAZE, ATTR_FLASH_MESSAGE
+    pair = curses.color_pair if has_colors else (lambda pair_id: 0)
+    ATTR_DEFAULT = pair(DEFAULT_PAIR); ATTR_FOOD = pair(FOOD_PAIR); ATTR_MAZE_FOOD = pair(MAZE_FOOD_PAIR)
+    ATTR_MAZE_WALL = pair(MAZE_WALL_PAIR); ATTR_OBSTACLE = pair(OBSTACLE_PAIR); ATTR_METEOR = pair(METEOR_PAIR)
+    ATTR_BALL = pair(BALL_PAIR); ATTR_ENEMY = pair(ENEMY_SNAKE_PAIR); ATTR_SNAKE_FLASH = pair(SNAKE_FLASH_PAIR)
+    ATTR_SNAKE_MAZE = pair(MAZE_SNAKE_PAIR) | curses.A_BOLD
+    ATTR_FLASH_MESSAGE = pair(SNAKE_FLASH_PAIR) | curses.A_BOLD
+    # Pickups use their type's pair (types 6-8 share the pair of their effect's elements)
+    for ptype in POWERUP_TYPES:
+        POWERUP_ATTRS[ptype] = pair(globals().get(f"POWERUP_TYPE_{ptype}_PAIR", DEFAULT_PAIR))
+
 def select_difficulty(stdscr, has_colors):
     """Displays difficulty menu, returns tuple (difficulty_dict, difficulty_key) or (None, None)."""
     # (Unchanged from v2.6)
@@ -225,31 +401,37 @@ def select_difficulty(stdscr, has_colors):
         if choice in DIFFICULTY_LEVELS: stdscr.clear(); return DIFFICULTY_LEVELS[choice], choice
         elif choice == 'q': return None, None
 
-def place_item(window, snake_body, existing_items, max_attempts=50):
-    """Finds random empty spot (x,y) excluding borders. Returns tuple or None."""
-    # (Unchanged from v2.6 - Includes logic to avoid items like maze walls if passed in existing_items)
-    sh, sw = window.getmaxyx(); min_y, max_y = 1, sh - 2; min_x, max_x = 1, sw - 2
+def place_item(window, snake_body, existing_items, max_attempts=50, screen_dims=None):
+    """Finds random empty spot (x,y) excluding borders. Returns tuple or None.
+
+    screen_dims, an (sh, sw) tuple, saves a getmaxyx() call when the caller has it.
+
+    Cells flagged in the occupancy bitmap (food, power-ups, obstacles, maze walls
+    and maze food) are always avoided; snake_body and existing_items only need to
+    cover things the bitmap does not track (snakes, balls, in-progress placements)
+    and hold plain (x,y) tuples; callers placing several items keep them in a set.
+    snake_body should be a SnakeBody (or a set), since it is probed per candidate.
+    """
+    sh, sw = screen_dims or window.getmaxyx(); min_y, max_y = 1, sh - 2; min_x, max_x = 1, sw - 2
     if max_y < min_y or max_x < min_x: return None # Playable area too small
     item_pos = None; attempts = 0;
+    # Only consult the bitmap if it was sized for this window
+    grid = occupancy_grid if (occupancy_w, occupancy_h) == (sw, sh) else None
+
     # Calculate a realistic max attempts based on estimated free cells
-    free_cells = (max_y - min_y + 1) * (max_x - min_x + 1) - len(snake_body) - len(existing_items)
+    playable_area = (max_y - min_y + 1) * (max_x - min_x + 1)
+    free_cells = playable_area - len(snake_body) - len(existing_items)
+    if grid is not None: free_cells -= sw * sh - grid.count(0) # Cells flagged in the bitmap (border excluded)
     realistic_max_attempts = max(10, free_cells // 2 if free_cells > 20 else 10) # Avoid excessive attempts if area is crowded
     max_attempts = min(max_attempts, realistic_max_attempts)
 
-    occupied_coords = set(snake_body)
-    # Add coordinates from various types of items in existing_items
-    for item in existing_items:
-        if isinstance(item, (tuple, list)) and len(item) >= 2 and all(isinstance(n, int) for n in item[:2]):
-             occupied_coords.add(item[0:2]) # Simple (x,y) tuple/list like food
-        elif isinstance(item, dict):
-            if 'pos' in item and isinstance(item['pos'], (tuple, list)) and len(item['pos']) >= 2:
-                occupied_coords.add(item['pos'][0:2]) # e.g., ball {'pos': (x,y), ...}
-            elif 'blocks' in item and isinstance(item['blocks'], (set, list)):
-                occupied_coords.update(item['blocks']) # e.g., obstacle effect {'blocks': {(x,y),...}}
-            elif 'maze_walls' in item and isinstance(item['maze_walls'], (set, list)):
-                occupied_coords.update(item['maze_walls']) # e.g., maze effect {'maze_walls': {(x,y),...}}
-            elif 'snake' in item and isinstance(item['snake'], list): # Avoid placing on enemy snake
-                 occupied_coords.update(item['snake'])
+    # A SnakeBody already answers 'in' in O(1); only copy it when extra cells must be merged in
+    occupied_coords = set(snake_body).union(existing_items) if existing_items else snake_body
+
+    # On a crowded board random probing mostly misses; enumerate the free cells instead
+    if free_cells < playable_area // 2:
+        candidates = free_cells_list(window, occupied_coords, (sh, sw))
+        return random.choice(candidates) if candidates else None
 
     while item_pos is None and attempts < max_attempts:
         if max_y < min_y or max_x < min_x: return None # Check again in case screen resized?
@@ -259,7 +441,7 @@ def place_item(window, snake_body, existing_items, max_attempts=50):
         except ValueError: return None # If min > max due to tiny screen
 
         potential_pos = (nx, ny)
-        if potential_pos not in occupied_coords:
+        if (grid is None or not grid[occupancy_index(nx, ny)]) and potential_pos not in occupied_coords:
             item_pos = potential_pos
         attempts += 1
 
@@ -271,13 +453,68 @@ def place_item(window, snake_body, existing_items, max_attempts=50):
     return item_pos
 
 
+def free_cells_list(window, occupied_coords, screen_dims=None):
+    """Lists every empty spot (x,y) excluding borders, scanning the occupancy bitmap once.
+
+    A cell is free if no bitmap bit is set and it is not in occupied_coords.
+    """
+    sh, sw = screen_dims or window.getmaxyx()
+    grid = occupancy_grid if (occupancy_w, occupancy_h) == (sw, sh) else None
+    free_cells = []
+    for y in range(1, sh - 1):
+        if grid is None:
+            free_cells.extend((x, y) for x in range(1, sw - 1) if (x, y) not in occupied_coords)
+            continue
+        row = grid[occupancy_index(1, y):occupancy_index(sw - 1, y)]
+        free_cells.extend((x, y) for x, bits in enumerate(row, 1) if not bits and (x, y) not in occupied_coords)
+    return free_cells
+
+def place_items(window, snake_body, count, screen_dims=None, existing_items=()):
+    """Picks up to count distinct random empty spots (x,y) excluding borders.
+
+    The free cells come from one scan of the occupancy bitmap and are drawn with
+    a single random.sample, so there are no per-item retries. existing_items are
+    extra (x,y) cells to avoid, as for place_item. Returns a list.
+    """
+    if count <= 0: return []
+    occupied_coords = set(snake_body).union(existing_items) if existing_items else snake_body
+    free_cells = free_cells_list(window, occupied_coords, screen_dims)
+    return random.sample(free_cells, min(count, len(free_cells)))
+
+
 # --- New Maze Generation for Wide Corridors ---
-def generate_wide_maze(target_h, target_w, corridor_w=3):
+def _carve_maze(maze_grid, target_h, target_w, coarse_path_cells, corridor_w):
+    """
+    Clears one corridor_w x corridor_w block per coarse path cell in a flat,
+    row-major bytearray grid (1 = wall, 0 = path). Each block row is a single
+    slice assignment, so the per-cell work stays out of the interpreter.
+    """
+    blank_row = bytes(corridor_w)
+    for cw, ch in coarse_path_cells:
+        x0 = cw * corridor_w; y0 = ch * corridor_w
+        x1 = min(target_w, x0 + corridor_w); y1 = min(target_h, y0 + corridor_w)
+        if x0 >= x1: continue
+        run = blank_row if x1 - x0 == corridor_w else bytes(x1 - x0)
+        for y in range(y0, y1):
+            row = y * target_w
+            maze_grid[row + x0:row + x1] = run
+
+_FLIP_CELLS = bytes.maketrans(b'\x00\x01', b'\x01\x00') # Swaps wall/path bytes
+
+def _grid_cells(maze_grid, target_w, value, origin=(0, 0)):
+    """Returns the set of (x, y) coords, shifted by origin, whose cell in the flat maze grid equals value (0 or 1)."""
+    # itertools.compress filters the indices in C; only the selected cells become tuples
+    mask = maze_grid if value else maze_grid.translate(_FLIP_CELLS)
+    ox, oy = origin
+    return {(i % target_w + ox, i // target_w + oy) for i in itertools.compress(range(len(maze_grid)), mask)}
+
+def generate_wide_maze(target_h, target_w, corridor_w=3, origin=(0, 0)):
     """
     Generates a maze structure with corridors of specified width.
     Uses DFS on a coarse grid, then expands paths and carves walls.
     Returns (set_of_wall_coords, set_of_path_coords, entrance_coord, exit_coord)
-    relative to a 0,0 origin for the target_h x target_w area.
+    for the target_h x target_w area placed with its top-left corner at origin
+    (default 0,0), so callers don't have to translate every cell afterwards.
     Returns empty sets and None coords if generation fails.
 
     FIX: Carves openings at index 1 or target_dim-2 to align with playable area.
@@ -304,11 +541,12 @@ def generate_wide_maze(target_h, target_w, corridor_w=3):
     stack = [(start_ch, start_cw)]
     coarse_maze[start_ch][start_cw] = False # Mark as path
     coarse_path_cells.add((start_cw, start_ch))
+    choice, mark_path = random.choice, coarse_path_cells.add # Local aliases for the DFS loop
 
     while stack:
         ch, cw = stack[-1]; neighbors = []
         # Check potential neighbors (2 cells away)
-        for dh, dw in [(0, 2), (0, -2), (2, 0), (-2, 0)]:
+        for dh, dw in ((0, 2), (0, -2), (2, 0), (-2, 0)):
             nh, nw = ch + dh, cw + dw
             # Check bounds and if neighbor is a wall (unvisited)
             if 0 < nh < grid_h and 0 < nw < grid_w and coarse_maze[nh][nw]:
@@ -316,41 +554,31 @@ def generate_wide_maze(target_h, target_w, corridor_w=3):
                 neighbors.append((nh, nw, wh, ww))
 
         if neighbors:
-            nh, nw, wh, ww = random.choice(neighbors)
-            coarse_maze[nh][nw] = False; coarse_path_cells.add((nw, nh)) # Mark neighbor as path
-            coarse_maze[wh][ww] = False; coarse_path_cells.add((ww, wh)) # Mark wall between as path
+            nh, nw, wh, ww = choice(neighbors)
+            coarse_maze[nh][nw] = False; mark_path((nw, nh)) # Mark neighbor as path
+            coarse_maze[wh][ww] = False; mark_path((ww, wh)) # Mark wall between as path
             stack.append((nh, nw))
         else:
             stack.pop() # Backtrack
 
     if not coarse_path_cells: return set(), set(), None, None # Should not happen if grid >= 3x3
 
-    # 2. Expand coarse path to full grid and define walls/paths
-    # Initialize full grid as all walls
-    full_maze_walls = set((x, y) for y in range(target_h) for x in range(target_w))
-    expanded_path = set()
-
+    # 2. Expand coarse path onto a flat wall grid (row-major, 1 = wall, 0 = path)
     corridor_offset = corridor_w // 2
-
-    # Iterate through coarse path cells (including walls carved between cells)
-    for cw, ch in coarse_path_cells:
-        center_x = cw * corridor_w + corridor_offset
-        center_y = ch * corridor_w + corridor_offset
-        # Carve out the corridor_w x corridor_w block for this path cell
-        for dy in range(-corridor_offset, corridor_offset + 1):
-            for dx in range(-corridor_offset, corridor_offset + 1):
-                px, py = center_x + dx, center_y + dy
-                if 0 <= px < target_w and 0 <= py < target_h:
-                    expanded_path.add((px, py))
-                    full_maze_walls.discard((px, py)) # Remove path from walls
+    maze_grid = bytearray(b'\x01') * (target_h * target_w)
+    _carve_maze(maze_grid, target_h, target_w, coarse_path_cells, corridor_w)
+    expanded_path = _grid_cells(maze_grid, target_w, 0, origin)
 
     # 3. Define Entrance and Exit on the boundary of the coarse grid
     # Boundary cells are path cells adjacent to the coarse grid edge (index 1 or grid_dim-2)
-    boundary_cells = sorted([cell for cell in coarse_path_cells if cell[0] == 1 or cell[0] == grid_w - 2 or cell[1] == 1 or cell[1] == grid_h - 2])
+    # Only the ring just inside the coarse grid edge can qualify, so walk that ring instead of every path cell
+    ring_rows = {(cw, ch) for ch in (1, grid_h - 2) for cw in range(1, grid_w - 1) if not coarse_maze[ch][cw]}
+    ring_cols = {(cw, ch) for cw in (1, grid_w - 2) for ch in range(1, grid_h - 1) if not coarse_maze[ch][cw]}
+    boundary_cells = sorted(ring_rows | ring_cols)
     if len(boundary_cells) < 2: # Need at least two points for entrance/exit
         print("Warning: Maze gen - Not enough boundary cells for entrance/exit.", file=sys.stderr)
         # Fallback: return maze without specific openings, player must find way out if needed
-        return full_maze_walls, expanded_path, None, None
+        return _grid_cells(maze_grid, target_w, 1, origin), expanded_path, None, None
 
     # Choose distinct entrance/exit from boundary cells
     entrance_coarse = random.choice(boundary_cells)
@@ -375,8 +603,8 @@ def generate_wide_maze(target_h, target_w, corridor_w=3):
 
     # Store the relative entrance/exit coords (might be useful later)
     # These are points *inside* the maze path near the opening.
-    entrance_coord = (entrance_center_x, entrance_center_y)
-    exit_coord = (exit_center_x, exit_center_y)
+    entrance_coord = (entrance_center_x + origin[0], entrance_center_y + origin[1])
+    exit_coord = (exit_center_x + origin[0], exit_center_y + origin[1])
 
     # --- MAZE ENTRY FIX (Option A Implementation) ---
     # Carve openings one step *inside* the maze boundary (index 1 or dim-2)
@@ -385,49 +613,193 @@ def generate_wide_maze(target_h, target_w, corridor_w=3):
     # Note: Requires target_h/w to be at least 3. Checked earlier.
     def carve_opening(coarse_cell, center_x, center_y):
         ccw, cch = coarse_cell
-        carve_y, carve_x = -1, -1 # Init with invalid values
+        span_x0, span_x1 = max(0, center_x - corridor_offset), min(target_w, center_x + corridor_offset + 1)
+        span_y0, span_y1 = max(0, center_y - corridor_offset), min(target_h, center_y + corridor_offset + 1)
 
         if cch == 1: # Top edge -> carve at y=1
-            carve_y = 1
-            for dx in range(-corridor_offset, corridor_offset + 1):
-                 if 0 <= center_x + dx < target_w: full_maze_walls.discard((center_x + dx, carve_y))
+            row = target_w
+            maze_grid[row + span_x0:row + span_x1] = bytes(span_x1 - span_x0)
         elif cch == grid_h - 2: # Bottom edge -> carve at y=target_h-2
-            carve_y = target_h - 2
-            for dx in range(-corridor_offset, corridor_offset + 1):
-                 if 0 <= center_x + dx < target_w: full_maze_walls.discard((center_x + dx, carve_y))
-        elif ccw == 1: # Left edge -> carve at x=1
-            carve_x = 1
-            for dy in range(-corridor_offset, corridor_offset + 1):
-                 if 0 <= center_y + dy < target_h: full_maze_walls.discard((carve_x, center_y + dy))
+            row = (target_h - 2) * target_w
+            maze_grid[row + span_x0:row + span_x1] = bytes(span_x1 - span_x0)
+        elif ccw == 1: # Left edge -> carve at x=1 (one strided slice down the column)
+            maze_grid[span_y0 * target_w + 1:span_y1 * target_w:target_w] = bytes(span_y1 - span_y0)
         elif ccw == grid_w - 2: # Right edge -> carve at x=target_w-2
-            carve_x = target_w - 2
-            for dy in range(-corridor_offset, corridor_offset + 1):
-                 if 0 <= center_y + dy < target_h: full_maze_walls.discard((carve_x, center_y + dy))
-        # print(f"Debug: Carved opening for coarse {coarse_cell} at X:{carve_x}, Y:{carve_y}", file=sys.stderr)
+            maze_grid[span_y0 * target_w + target_w - 2:span_y1 * target_w:target_w] = bytes(span_y1 - span_y0)
 
 
     carve_opening(entrance_coarse, entrance_center_x, entrance_center_y)
     carve_opening(exit_coarse, exit_center_x, exit_center_y)
 
+    full_maze_walls = _grid_cells(maze_grid, target_w, 1, origin)
 
     return full_maze_walls, expanded_path, entrance_coord, exit_coord
 
 
+# --- Player Snake Step ---
+def step_snake(snake, direction, is_maze_active):
+    """Works out the snake's next head and what it runs into, without moving it.
+
+    Returns (new_head, event) with event one of the STEP_* codes. Screen edges,
+    obstacles, maze walls and food all come from one occupancy bitmap lookup.
+    """
+    dx, dy = DIRECTION_DELTAS[direction]
+    head_x, head_y = snake[0]
+    new_head = (head_x + dx, head_y + dy)
+    # The head is on-screen, so the next cell is at worst on the OCC_BORDER ring.
+    # Maze openings are at 1/dim-2, so leaving the screen is always game over.
+    cell_bits = occupancy_grid[(new_head[1] + 1) * occupancy_stride + new_head[0] + 1]
+    if cell_bits & OCC_DEADLY: return new_head, STEP_DIED
+    if len(snake) > 1 and new_head in snake: return new_head, STEP_DIED # Checked against the body before the move
+    if is_maze_active: return new_head, STEP_ATE_MAZE if cell_bits & OCC_MAZE_FOOD else STEP_MOVED
+    return new_head, STEP_ATE if cell_bits & OCC_FOOD else STEP_MOVED
+
+
+# --- Enemy AI and Pathfinding ---
+def find_path(start, goal, blocked_mask=OCC_MAZE_WALL, avoid=None):
+    """A* over the occupancy bitmap (4-neighbour moves, Manhattan heuristic).
+
+    Nodes are flat bitmap indices; g-score and parent live in flat int arrays
+    and the OCC_BORDER ring stops the search at the screen edge. Returns the
+    route as a list of (x, y) steps stored in reverse order (next step last,
+    so callers can pop()), or None if unreachable.
+    """
+    w, h, stride = occupancy_w, occupancy_h, occupancy_stride
+    (sx, sy), (gx, gy) = start, goal
+    if not (0 <= sx < w and 0 <= sy < h and 0 <= gx < w and 0 <= gy < h): return None
+    grid = occupancy_grid; blocked_mask |= OCC_BORDER
+    start_idx, goal_idx = occupancy_index(sx, sy), occupancy_index(gx, gy)
+    if grid[goal_idx] & blocked_mask: return None
+    avoid_idx = occupancy_index(*avoid) if avoid and 0 <= avoid[0] < w and 0 <= avoid[1] < h else -1
+    goal_col, goal_row = gx + 1, gy + 1 # Padded coordinates for the heuristic
+
+    g_score = array.array('i', [-1]) * len(grid)
+    parent = array.array('i', [-1]) * len(grid)
+    g_score[start_idx] = 0
+    open_heap = [(abs(sx - gx) + abs(sy - gy), 0, start_idx)]
+    while open_heap:
+        _, cur_g, cur = heapq.heappop(open_heap)
+        if cur == goal_idx: break
+        if cur_g > g_score[cur]: continue # Stale heap entry
+        next_g = cur_g + 1
+        for nxt in (cur + 1, cur - 1, cur + stride, cur - stride):
+            if nxt == avoid_idx or grid[nxt] & blocked_mask: continue
+            if g_score[nxt] == -1 or next_g < g_score[nxt]:
+                g_score[nxt] = next_g; parent[nxt] = cur
+                heapq.heappush(open_heap, (next_g + abs(nxt % stride - goal_col) + abs(nxt // stride - goal_row), next_g, nxt))
+    else:
+        return None
+
+    route = []; cur = goal_idx
+    while cur != start_idx:
+        route.append((cur % stride - 1, cur // stride - 1)); cur = parent[cur]
+    return route
+
+
+def reachable_target(start, blocked_mask=OCC_MAZE_WALL):
+    """Picks a random cell start can reach around blocked_mask cells, or None.
+
+    Flood-fills the occupancy bitmap from start and prefers cells in the
+    middle half of the screen, like the enemy's usual internal target.
+    """
+    w, h, stride = occupancy_w, occupancy_h, occupancy_stride
+    sx, sy = start
+    if not (0 <= sx < w and 0 <= sy < h): return None
+    grid = occupancy_grid; blocked_mask |= OCC_BORDER
+    seen = bytearray(len(grid)); stack = [occupancy_index(sx, sy)]; seen[stack[0]] = 1
+    cells = []; inner = []
+    x0, x1, y0, y1 = w // 4, 3 * w // 4, h // 4, 3 * h // 4
+    while stack:
+        cur = stack.pop()
+        x, y = cur % stride - 1, cur // stride - 1
+        cells.append((x, y))
+        if x0 <= x <= x1 and y0 <= y <= y1: inner.append((x, y))
+        for nxt in (cur + 1, cur - 1, cur + stride, cur - stride):
+            if not seen[nxt] and not grid[nxt] & blocked_mask:
+                seen[nxt] = 1; stack.append(nxt)
+    return random.choice(inner or cells)
+
+
+def step_enemy(head, last_pos, target, walls, route_step=None):
+    """Picks an enemy's next head toward target, or None if it has to stay put.
+
+    Steers along the axis with the greater distance, with an occasional random
+    perpendicular wobble (not straight back if avoidable). route_step, a cell
+    next to head taken from a maze route, overrides the steering. A move into
+    walls falls back to the ideal step; reversing onto last_pos never happens.
+    """
+    e_head_x, e_head_y = head
+    # Sign of the offset to the target on each axis (-1, 0 or 1)
+    ideal_dx = (target[0] > e_head_x) - (target[0] < e_head_x)
+    ideal_dy = (target[1] > e_head_y) - (target[1] < e_head_y)
+
+    # Prioritize axis with greater distance
+    if ideal_dx != 0 and ideal_dy != 0:
+        if abs(target[0] - e_head_x) > abs(target[1] - e_head_y): ideal_dy = 0
+        else: ideal_dx = 0
+
+    final_dx, final_dy = ideal_dx, ideal_dy
+    # Add random wobble
+    if random.random() < ENEMY_RANDOM_MOVE_CHANCE:
+        # Wobble perpendicular; if there is no ideal move, choose any direction
+        possible_wobbles = ENEMY_WOBBLES_H if ideal_dx else (ENEMY_WOBBLES_V if ideal_dy else ENEMY_WOBBLES_ANY)
+        # Ensure wobble doesn't go directly backwards if possible
+        if last_pos:
+            back_dx, back_dy = e_head_x - last_pos[0], e_head_y - last_pos[1]
+            possible_wobbles = [(dx, dy) for dx, dy in possible_wobbles if (dx, dy) != (back_dx, back_dy)]
+            if not possible_wobbles: # If only option is backwards, allow it
+                possible_wobbles = [(back_dx, back_dy)]
+
+        if possible_wobbles: final_dx, final_dy = random.choice(possible_wobbles)
+
+    if route_step is not None: final_dx, final_dy = route_step[0] - e_head_x, route_step[1] - e_head_y
+
+    # --- Enemy Maze Collision Check ---
+    new_e_head = (e_head_x + final_dx, e_head_y + final_dy)
+    if new_e_head not in walls:
+        # Prevent moving backwards immediately (stop instead)
+        return new_e_head if new_e_head != last_pos else None
+    # Hit a maze wall: try the ideal move if the random one failed, otherwise stop
+    if (final_dx, final_dy) != (ideal_dx, ideal_dy):
+        new_e_head_ideal = (e_head_x + ideal_dx, e_head_y + ideal_dy)
+        if new_e_head_ideal not in walls and new_e_head_ideal != last_pos: return new_e_head_ideal
+    return None
+
+
 # --- Power-up Effect Management ---
-def update_active_effects(stdscr, snake, current_timeout, difficulty_timeout):
-    """Updates state for active power-ups. Returns new state flags/timeout."""
+@functools.lru_cache(maxsize=4)
+def union_cells(cell_sets):
+    """Union of a tuple of frozensets, memoised so the same effects aren't re-merged every tick."""
+    if len(cell_sets) == 1: return cell_sets[0]
+    return frozenset().union(*cell_sets)
+
+def cell_runs(cells):
+    """Groups cells into horizontal runs, as [y, x, length] lists sorted by row then column."""
+    runs = []
+    for x, y in sorted(cells, key=lambda cell: (cell[1], cell[0])):
+        if runs and runs[-1][0] == y and runs[-1][1] + runs[-1][2] == x: runs[-1][2] += 1
+        else: runs.append([y, x, 1])
+    return runs
+
+def effect_cells(effect_type, key):
+    """Cells of all active effects of effect_type under data[key] (e.g. 'maze_walls'), as one frozenset."""
+    if not active_effect_counts[effect_type]: return frozenset() # Usual case: skip the scan entirely
+    return union_cells(tuple(eff['data'].get(key, frozenset()) for eff in active_effects if eff['type'] == effect_type))
+
+def update_active_effects(stdscr, snake, current_timeout, difficulty_timeout, screen_dims=None):
+    """Updates state for active power-ups. Returns new state flags/timeout.
+
+    screen_dims, an (sh, sw) tuple, saves a getmaxyx() call when the caller has it.
+    """
     global active_effects, ball_powerup_count, score, type1_food_spawn_count
     global last_type1_decrement_time, foods, maze_food_items
-    sh, sw = stdscr.getmaxyx(); current_time = time.time()
-    new_timeout = current_timeout; expired_indices = []
-    is_thick_active = False; active_obstacles = set(); active_maze_walls = set(); is_maze_active = False
+    sh, sw = screen_dims or stdscr.getmaxyx(); current_time = tick_time # Sampled once per tick by the main loop
+    new_timeout = current_timeout
     user_head = snake[0] if snake else None
 
-    # Collect maze walls from active maze effects FIRST
-    for effect in active_effects:
-         if effect['type'] == 8:
-             active_maze_walls.update(effect.get('data', {}).get('maze_walls', set()))
-             is_maze_active = True # Set flag if any maze effect is active
+    # Collect maze walls from active maze effects FIRST (cached until the set of mazes changes)
+    active_maze_walls = effect_cells(8, 'maze_walls')
+    is_maze_active = len(active_maze_walls) > 0
 
 
     if current_time - last_type1_decrement_time > TYPE1_DECREMENT_INTERVAL:
@@ -435,148 +807,128 @@ def update_active_effects(stdscr, snake, current_timeout, difficulty_timeout):
         last_type1_decrement_time = current_time
 
     # Process effects and check for expiration
-    for i, effect in enumerate(active_effects):
+    for effect in active_effects:
         if current_time >= effect['end_time']:
-            if i not in expired_indices: expired_indices.append(i)
+            effect['expired'] = True
             effect_type = effect['type']
+            active_effect_counts[effect_type] -= 1 # Timed-out effects are uncounted here, others at cleanup
              # Restore timeout if effect modified it
-            if effect_type in [1, 4, 8] and 'original_timeout' in effect.get('data', {}):
+            if effect_type in TIMEOUT_MODIFYING_EFFECTS and 'original_timeout' in effect['data']:
                 original_timeout = effect['data']['original_timeout']
-                # Restore only if no other effect of the same type is still active AND modifying timeout
-                restore = True
-                for j, other_effect in enumerate(active_effects):
-                    if i != j and other_effect['type'] == effect_type and \
-                       current_time < other_effect['end_time'] and \
-                       'original_timeout' in other_effect.get('data', {}):
-                        restore = False
-                        break
-                if restore:
+                # Restore only if no other effect of the same type is still active
+                # (every active type 1/4/8 effect modifies the timeout)
+                if active_effect_counts[effect_type] == 0:
                      new_timeout = max(MIN_TIMEOUT, min(MAX_TIMEOUT, original_timeout))
 
+            vacate_effect(effect) # Free obstacle/maze-wall cells in the occupancy bitmap
+
             if effect_type == 8: # Maze cleanup
+                vacate(maze_food_items, OCC_MAZE_FOOD)
                 maze_food_items.clear(); # Clear specific maze food
                 # Don't clear normal food here, handled by activation/expiration maybe?
                 # Spawn a new regular food item if snake exists
                 if snake:
-                    all_items = power_ups_on_screen + foods # Avoid placing on other items
-                    # Avoid any remaining maze walls? No, maze is gone.
-                    new_food_pos = place_item(stdscr, snake, all_items)
-                    if new_food_pos: foods.append(new_food_pos)
+                    # Other food/power-ups are avoided via the occupancy bitmap
+                    new_food_pos = place_item(stdscr, snake, [], screen_dims=(sh, sw))
+                    if new_food_pos: foods.append(new_food_pos); occupy((new_food_pos,), OCC_FOOD)
 
             # For Type 2 (Balls), ensure balls are removed if effect expires
             elif effect_type == 2:
-                 effect['data']['balls'] = []
+                 effect['data'].update({'ball_xs': [], 'ball_ys': [], 'ball_dxs': [], 'ball_dys': []})
 
             continue # Skip update logic for expired effects
 
         # Update active effects
         effect_type = effect['type']
-        effect_data = effect.get('data', {})
+        effect_data = effect['data']
         if effect_type == 1: pass # No continuous update needed
         elif effect_type == 2: # Bouncing Balls
-            new_balls = []; balls_data = effect_data.get('balls', [])
-            if not balls_data:
+            # Balls are stored as parallel x/y/velocity lists (one entry per ball)
+            b_xs = effect_data.get('ball_xs', ()); b_ys = effect_data.get('ball_ys', ())
+            b_dxs = effect_data.get('ball_dxs', ()); b_dys = effect_data.get('ball_dys', ())
+            if not b_xs:
                 # This should not happen if effect is active, but handle defensively
-                if i not in expired_indices: expired_indices.append(i); continue
-
-            for ball in balls_data:
-                bx, by = ball['pos']; bdx, bdy = ball['vel']
-                n_bx, n_by = bx + bdx, by + bdy
-
-                # Bounce off screen edges (1 to dim-2)
-                if n_bx <= 0 or n_bx >= sw - 1: bdx *= -1; n_bx = bx # Reverse direction, stay put this frame
-                if n_by <= 0 or n_by >= sh - 1: bdy *= -1; n_by = by
-
+                effect['expired'] = True; continue
+
+            # Advance every ball at once, bouncing off screen edges (1 to dim-2): reverse
+            # direction and stay put this frame. Then test all candidate cells against
+            # the maze walls with one set intersection instead of a probe per ball.
+            next_xs = [bx + bdx if 0 < bx + bdx < sw - 1 else bx for bx, bdx in zip(b_xs, b_dxs)]
+            next_dxs = [bdx if 0 < bx + bdx < sw - 1 else -bdx for bx, bdx in zip(b_xs, b_dxs)]
+            next_ys = [by + bdy if 0 < by + bdy < sh - 1 else by for by, bdy in zip(b_ys, b_dys)]
+            next_dys = [bdy if 0 < by + bdy < sh - 1 else -bdy for by, bdy in zip(b_ys, b_dys)]
+            blocked = active_maze_walls.intersection(zip(next_xs, next_ys)) if active_maze_walls else ()
+
+            if not blocked and snake.cells.keys().isdisjoint(zip(next_xs, next_ys)):
+                # Common case: no ball hits a wall or the snake, so every ball takes its step
+                effect_data['ball_xs'] = next_xs; effect_data['ball_ys'] = next_ys
+                effect_data['ball_dxs'] = next_dxs; effect_data['ball_dys'] = next_dys
+                continue
+
+            kept_xs = []; kept_ys = []; kept_dxs = []; kept_dys = []
+            for bx, by, n_bx, n_by, bdx, bdy in zip(b_xs, b_ys, next_xs, next_ys, next_dxs, next_dys):
                 # Simple collision with maze walls (stop ball) - could bounce instead
-                if (n_bx, n_by) in active_maze_walls:
+                if (n_bx, n_by) in blocked:
                      # Keep current position, maybe zero velocity or just skip update? Stop for now.
                      n_bx, n_by = bx, by
-                     # bdx, bdy = 0, 0 # Optional: stop velocity
-                else:
-                    # Check collision with player snake AFTER moving
-                    if (n_bx, n_by) in snake:
-                        if len(snake) > 1: snake.pop(); score = max(0, score + PENALTY_BALL)
-                        # Ball could disappear or bounce off snake? Disappears for now.
-                        continue # Don't add this ball back
+                # Check collision with player snake AFTER moving
+                elif (n_bx, n_by) in snake: # O(1), see SnakeBody
+                    if len(snake) > 1: snake.pop(); score = max(0, score + PENALTY_BALL)
+                    # Ball could disappear or bounce off snake? Disappears for now.
+                    continue # Don't add this ball back
 
-                ball['pos'] = (n_bx, n_by); ball['vel'] = (bdx, bdy)
-                new_balls.append(ball)
+                kept_xs.append(n_bx); kept_ys.append(n_by); kept_dxs.append(bdx); kept_dys.append(bdy)
 
-            effect['data']['balls'] = new_balls
-            if not new_balls and ball_powerup_count > 0: # Expire if all balls are gone
-                 if i not in expired_indices: expired_indices.append(i)
+            effect_data['ball_xs'] = kept_xs; effect_data['ball_ys'] = kept_ys
+            effect_data['ball_dxs'] = kept_dxs; effect_data['ball_dys'] = kept_dys
+            if not kept_xs and ball_powerup_count > 0: # Expire if all balls are gone
+                 effect['expired'] = True
 
 
-        elif effect_type == 3: is_thick_active = True # Flag used elsewhere
+        elif effect_type == 3: pass # Thickness is read from active_effect_counts after cleanup
         elif effect_type == 4: pass # No continuous update needed
         elif effect_type == 5: # Enemy Snake
              if not user_head: continue # Need player snake to exist
-             enemy_snake = effect_data.get('snake', [])
+             enemy_snake = effect_data.get('snake', ())
              if not enemy_snake:
-                 if i not in expired_indices: expired_indices.append(i); continue
+                 effect['expired'] = True; continue
 
              target = effect_data.get('target'); state = effect_data.get('state')
              if not target or not state: # Should not happen if active
-                  if i not in expired_indices: expired_indices.append(i); continue
+                  effect['expired'] = True; continue
 
              e_head_x, e_head_y = enemy_snake[0]
              last_pos = enemy_snake[1] if len(enemy_snake) > 1 else None
              moved = False
 
-             # Basic AI: Move towards target, with some randomness
-             if state in ['seeking_internal', 'leaving']:
-                 ideal_dx, ideal_dy = 0, 0
-                 if e_head_x != target[0]: ideal_dx = 1 if target[0] > e_head_x else -1
-                 if e_head_y != target[1]: ideal_dy = 1 if target[1] > e_head_y else -1
-
-                 # Prioritize axis with greater distance
-                 if ideal_dx != 0 and ideal_dy != 0:
-                     if abs(target[0] - e_head_x) > abs(target[1] - e_head_y): ideal_dy = 0
-                     else: ideal_dx = 0
-
-                 final_dx, final_dy = ideal_dx, ideal_dy
-                 # Add random wobble
-                 if random.random() < ENEMY_RANDOM_MOVE_CHANCE:
-                     possible_wobbles = []
-                     if ideal_dx != 0: possible_wobbles = [(0, 1), (0, -1)] # Wobble perpendicular
-                     elif ideal_dy != 0: possible_wobbles = [(1, 0), (-1, 0)]
-                     # If no ideal move or wobble failed, choose any direction
-                     if not possible_wobbles or (ideal_dx == 0 and ideal_dy == 0) : possible_wobbles = [(0,1),(0,-1),(1,0),(-1,0)]
-                     # Ensure wobble doesn't go directly backwards if possible
-                     if last_pos:
-                          back_dx, back_dy = e_head_x - last_pos[0], e_head_y - last_pos[1]
-                          possible_wobbles = [(dx, dy) for dx, dy in possible_wobbles if (dx, dy) != (back_dx, back_dy)]
-                          if not possible_wobbles: # If only option is backwards, allow it
-                               possible_wobbles = [(back_dx, back_dy)]
-
-                     if possible_wobbles: final_dx, final_dy = random.choice(possible_wobbles)
-
-
-                 next_e_x, next_e_y = e_head_x + final_dx, e_head_y + final_dy
-                 new_e_head = (next_e_x, next_e_y)
-
-                 # --- Enemy Maze Collision Check ---
-                 collision_with_maze = new_e_head in active_maze_walls
-                 # Prevent moving backwards immediately unless stuck
-                 is_reverse_move = new_e_head == last_pos
-
-                 if not collision_with_maze and not is_reverse_move:
+             # Basic AI: Move towards target, with some randomness (see step_enemy)
+             if state in ('seeking_internal', 'leaving'):
+                 # Inside an active maze, follow a cached A* route around the walls.
+                 # A failed search is cached as () until the route ages out, steering
+                 # greedily meanwhile, and the target moves somewhere reachable.
+                 route = None; route_step = None
+                 if active_maze_walls and state == 'seeking_internal':
+                     route = effect_data.get('route')
+                     route_age = effect_data.get('route_age', 0)
+                     if (not route and route != ()) or route_age >= ENEMY_ROUTE_REFRESH_TICKS:
+                         route = find_path((e_head_x, e_head_y), target, OCC_MAZE_WALL, avoid=last_pos)
+                         route_age = 0
+                         if route is None:
+                             route = ()
+                             new_target = reachable_target((e_head_x, e_head_y))
+                             if new_target: effect_data['target'] = target = new_target
+                     effect_data['route'] = route; effect_data['route_age'] = route_age + 1
+                     if route:
+                         step_x, step_y = route[-1]
+                         if abs(step_x - e_head_x) + abs(step_y - e_head_y) == 1: route_step = route[-1]
+                         else: effect_data['route'] = route = None # Drifted off the route
+
+                 new_e_head = step_enemy((e_head_x, e_head_y), last_pos, target, active_maze_walls, route_step)
+                 if new_e_head is not None:
                      moved = True
-                     enemy_snake.insert(0, new_e_head)
-                 elif not collision_with_maze and is_reverse_move and len(enemy_snake) > 1:
-                      # Allow reverse only if no other option? Or just stop? Stop for now.
-                      moved = False
-                 elif collision_with_maze:
-                      # Hit a maze wall, don't move. Try alternative? For now, just stop.
-                      moved = False
-                      # Maybe try the ideal move if the random one failed?
-                      if (final_dx, final_dy) != (ideal_dx, ideal_dy):
-                           next_e_x, next_e_y = e_head_x + ideal_dx, e_head_y + ideal_dy
-                           new_e_head_ideal = (next_e_x, next_e_y)
-                           if new_e_head_ideal not in active_maze_walls and new_e_head_ideal != last_pos:
-                                moved = True
-                                enemy_snake.insert(0, new_e_head_ideal)
+                     enemy_snake.appendleft(new_e_head)
 
+                 if route and moved and enemy_snake[0] == route[-1]: route.pop()
 
                  # State transitions and target updates (unchanged logic)
                  if state == 'seeking_internal':
@@ -595,15 +947,14 @@ def update_active_effects(stdscr, snake, current_timeout, difficulty_timeout):
 
                  elif state == 'leaving':
                       # Check if the enemy head (if it moved) is off-screen
-                      current_e_head = enemy_snake[0]
-                      is_off_screen = not (0 <= current_e_head[0] < sw and 0 <= current_e_head[1] < sh)
-                      if is_off_screen:
+                      ex, ey = enemy_snake[0]
+                      if (ex | ey) < 0 or ex >= sw or ey >= sh: # Either coordinate negative <=> their OR is negative
                            # Remove the head segment that went off-screen
-                           enemy_snake.pop(0)
+                           enemy_snake.popleft()
                            # Continue removing tail segments until none are left or effect expires
                            if len(enemy_snake) > 0: enemy_snake.pop()
                            else: # Snake is fully off-screen
-                               if i not in expired_indices: expired_indices.append(i)
+                               effect['expired'] = True
                            moved = False # Don't pop tail below if snake emptied
 
              # Pop tail if enemy moved and didn't grow implicitly
@@ -617,7 +968,7 @@ def update_active_effects(stdscr, snake, current_timeout, difficulty_timeout):
 
              # Check if enemy snake still exists
              if not enemy_snake:
-                 if i not in expired_indices: expired_indices.append(i); continue
+                 effect['expired'] = True; continue
 
              effect['data']['snake'] = enemy_snake # Update effect data
 
@@ -627,59 +978,65 @@ def update_active_effects(stdscr, snake, current_timeout, difficulty_timeout):
                  enemy_head = enemy_snake[0]
                  if user_head == enemy_head: # Head-on collision
                      # Player absorbs enemy
-                     segments_to_add = list(reversed(enemy_snake[1:]))
-                     if segments_to_add: snake.extend(segments_to_add)
+                     snake.extend(itertools.islice(reversed(enemy_snake), len(enemy_snake) - 1)) # Tail-first, head excluded
                      score += SCORE_ENEMY_HEAD
                      # Remove the enemy effect
-                     if i not in expired_indices: expired_indices.append(i);
+                     effect['expired'] = True
                      # Trigger growth flag? No, handled by extend.
-                 elif user_head in enemy_snake[1:]: # Player hits enemy body
+                 elif user_head in enemy_snake: # Player hits enemy body (head already ruled out above)
                      if len(snake) > 1:
-                         segments_to_remove = max(1, len(snake) // 3) # Penalty
                          score = max(0, score + PENALTY_ENEMY_BODY)
-                         for _ in range(segments_to_remove):
-                             if len(snake) > 1: snake.pop()
-                             else: break # Don't remove the head
+                         snake.shed(max(1, len(snake) // 3)) # Penalty
                      elif len(snake) == 1: # Kill player if only head remains
                           snake.clear() # Signal game over
                      # Enemy snake might split here in future, but not implemented currently
 
 
-        elif effect_type == 6: active_obstacles.update(effect_data.get('blocks', [])) # Used for collision checks elsewhere
+        elif effect_type == 6: pass # Blocks are static; collected after cleanup below
         elif effect_type == 7: # Meteor Rain
-            new_meteors = []; meteors_data = effect_data.get('meteors', [])
-            if not meteors_data:
-                 if i not in expired_indices: expired_indices.append(i); continue
-
-            for meteor in meteors_data:
-                mx, my = meteor['pos']; mdx, mdy = meteor['vel']
-                nmy = my + mdy; nmx = mx + mdx
-
+            # Meteors are stored as parallel x/y/velocity lists (one entry per meteor)
+            m_xs = effect_data.get('meteor_xs', ()); m_ys = effect_data.get('meteor_ys', ())
+            m_dxs = effect_data.get('meteor_dxs', ()); m_dys = effect_data.get('meteor_dys', ())
+            if not m_xs:
+                 effect['expired'] = True; continue
+
+            # Step all meteors at once, then resolve maze-wall hits with a single set intersection
+            next_xs = [mx + mdx for mx, mdx in zip(m_xs, m_dxs)]
+            next_ys = [my + mdy for my, mdy in zip(m_ys, m_dys)]
+            blocked = active_maze_walls.intersection(zip(next_xs, next_ys)) if active_maze_walls else ()
+
+            if (not blocked and min(next_xs) >= 0 and max(next_xs) < sw and max(next_ys) < sh
+                    and snake.cells.keys().isdisjoint(zip(next_xs, next_ys))):
+                # Common case: every meteor is still on screen and hit nothing
+                effect_data['meteor_xs'] = next_xs; effect_data['meteor_ys'] = next_ys
+                continue
+
+            kept_xs = []; kept_ys = []; kept_dxs = []; kept_dys = []
+            for nmx, nmy, mdx, mdy in zip(next_xs, next_ys, m_dxs, m_dys):
                 # Check screen bounds first
                 if not (0 <= nmx < sw): continue # Disappears if goes off sides
 
                 next_pos = (nmx, nmy)
 
                 # --- Meteor Maze Collision Check ---
-                if next_pos in active_maze_walls:
+                if next_pos in blocked:
                     # Meteor hits wall, disappears
                     continue # Don't add back to list
 
-                meteor['pos'] = next_pos # Update position
-
                 # Check collision with player snake
-                if meteor['pos'] in snake:
+                if next_pos in snake:
                     if len(snake) > 1: snake.pop(); score = max(0, score + PENALTY_METEOR)
                     # Meteor disappears after hitting snake
                     continue # Don't add back to list
 
                 # Keep meteor if still on screen vertically
                 if nmy < sh:
-                    new_meteors.append(meteor)
+                    kept_xs.append(nmx); kept_ys.append(nmy); kept_dxs.append(mdx); kept_dys.append(mdy)
 
-            effect['data']['meteors'] = new_meteors
-            if not new_meteors: # Expire if all meteors are gone
-                 if i not in expired_indices: expired_indices.append(i)
+            effect_data['meteor_xs'] = kept_xs; effect_data['meteor_ys'] = kept_ys
+            effect_data['meteor_dxs'] = kept_dxs; effect_data['meteor_dys'] = kept_dys
+            if not kept_xs: # Expire if all meteors are gone
+                 effect['expired'] = True
 
 
         elif effect_type == 8:
@@ -688,99 +1045,73 @@ def update_active_effects(stdscr, snake, current_timeout, difficulty_timeout):
 
 
     # --- Cleanup Expired Effects ---
-    if expired_indices:
-        expired_indices.sort(reverse=True) # Sort to delete from end without index issues
-        for i in expired_indices:
-            if 0 <= i < len(active_effects):
-                # print(f"Debug: Removing effect type {active_effects[i]['type']} at index {i}", file=sys.stderr)
-                del active_effects[i]
+    # Effects are flagged 'expired' above and compacted out in place, keeping draw order
+    kept = 0
+    for effect in active_effects:
+        if not effect.get('expired'): active_effects[kept] = effect; kept += 1
+        elif current_time < effect['end_time']: active_effect_counts[effect['type']] -= 1 # Removed early
+    del active_effects[kept:]
 
     # --- Recalculate State Flags After Cleanup ---
     is_any_effect_active = len(active_effects) > 0
-    is_thick_active = any(eff['type'] == 3 for eff in active_effects)
+    is_thick_active = active_effect_counts[3] > 0 # Kept in step by activation and cleanup
     # is_maze_active is already updated based on initial loop
-    # recalculate active_obstacles and active_maze_walls based on remaining effects
-    active_obstacles = set().union(*(eff['data'].get('blocks', set()) for eff in active_effects if eff['type'] == 6))
-    active_maze_walls = set().union(*(eff['data'].get('maze_walls', set()) for eff in active_effects if eff['type'] == 8))
+    # recalculate active_maze_walls based on remaining effects (obstacles live in the occupancy bitmap)
+    active_maze_walls = effect_cells(8, 'maze_walls')
     is_maze_active = len(active_maze_walls) > 0
 
 
     # Ensure timeout is within bounds
     new_timeout = max(MIN_TIMEOUT, min(MAX_TIMEOUT, new_timeout))
 
-    return new_timeout, is_any_effect_active, is_thick_active, active_obstacles, active_maze_walls, is_maze_active
+    return new_timeout, is_any_effect_active, is_thick_active, active_maze_walls, is_maze_active
 
-def draw_active_effects(stdscr, has_colors):
+def draw_active_effects(stdscr):
     """Draws visuals for active effects (balls, enemy, obstacles, meteors, maze)."""
     global active_effects, maze_food_items
-    sh, sw = stdscr.getmaxyx()
-    obstacle_attrib = curses.color_pair(OBSTACLE_PAIR) if has_colors else 0
-    meteor_attrib = curses.color_pair(METEOR_PAIR) if has_colors else 0
-    maze_wall_attrib = curses.color_pair(MAZE_WALL_PAIR) if has_colors else 0
-    maze_food_attrib = curses.color_pair(MAZE_FOOD_PAIR) if has_colors else 0
-    ball_attrib = curses.color_pair(BALL_PAIR) if has_colors else 0
-    enemy_attrib = curses.color_pair(ENEMY_SNAKE_PAIR) if has_colors else 0
+    if not active_effects and not maze_food_items: return # Nothing to draw most of the time
 
     # Draw maze walls and food first (static background elements)
-    maze_walls_drawn = set()
-    maze_food_drawn = set()
     for effect in active_effects:
          if effect['type'] == 8:
-            # Draw Maze Walls using 'maze_walls' key from effect data
-            for wx, wy in effect.get('data',{}).get('maze_walls', []): # Use the walls from effect data
-                if (wx, wy) not in maze_walls_drawn: # Avoid overdrawing if multiple effects somehow
-                    if 0 <= wy < sh and 0 <= wx < sw:
-                        try: stdscr.addch(wy, wx, WALL_SYMBOL, maze_wall_attrib)
-                        except curses.error: pass # Ignore drawing errors at edge
-                    maze_walls_drawn.add((wx, wy))
+            # Walls never move, so group them into horizontal runs once and draw one string per run
+            effect_data = effect['data']
+            if 'wall_runs' not in effect_data: effect_data['wall_runs'] = cell_runs(effect_data.get('maze_walls', ()))
+            for wy, wx, run_len in effect_data['wall_runs']:
+                frame_text(wy, wx, WALL_SYMBOL * run_len, ATTR_MAZE_WALL)
 
     # Draw Maze Food using global list (populated during activation)
     for fx, fy in maze_food_items:
-        if (fx, fy) not in maze_food_drawn:
-             if 0 <= fy < sh and 0 <= fx < sw:
-                try: stdscr.addch(fy, fx, FOOD_SYMBOL, maze_food_attrib)
-                except curses.error: pass
-             maze_food_drawn.add((fx,fy))
+        frame_put(fy, fx, FOOD_SYMBOL, ATTR_MAZE_FOOD)
 
     # Draw other dynamic elements
     for effect in active_effects:
-        effect_type = effect['type']; effect_data = effect.get('data', {})
+        effect_type = effect['type']; effect_data = effect['data']
         if effect_type == 2: # Balls
-            for ball in effect_data.get('balls', []):
-                bx, by = ball['pos'];
-                if 0 <= by < sh and 0 <= bx < sw:
-                    # Avoid drawing over maze walls (optional, makes walls solid)
-                    # if (bx, by) not in maze_walls_drawn:
-                        try: stdscr.addch(by, bx, BALL_SYMBOL, ball_attrib)
-                        except curses.error: pass
+            for bx, by in zip(effect_data.get('ball_xs', ()), effect_data.get('ball_ys', ())):
+                # Drawn over maze walls; balls stop short of them anyway
+                frame_put(by, bx, BALL_SYMBOL, ATTR_BALL)
         elif effect_type == 5: # Enemy Snake
-            for seg in effect_data.get('snake', []):
-                ex, ey = seg;
-                if 0 <= ey < sh and 0 <= ex < sw:
-                     # Avoid drawing over maze walls? Or let enemy phase through? Let it phase for now.
-                     # if (ex, ey) not in maze_walls_drawn:
-                        try: stdscr.addch(ey, ex, ENEMY_SNAKE_SYMBOL, enemy_attrib)
-                        except curses.error: pass
+            for ex, ey in effect_data.get('snake', ()):
+                # Avoid drawing over maze walls? Or let enemy phase through? Let it phase for now.
+                frame_put(ey, ex, ENEMY_SNAKE_SYMBOL, ATTR_ENEMY)
         elif effect_type == 6: # Obstacles
-            for ox, oy in effect_data.get('blocks', []):
+            for ox, oy in effect_data.get('blocks', ()):
                  # Avoid drawing over maze walls? Obstacles likely permanent. Let them draw over.
-                 if 0 <= oy < sh and 0 <= ox < sw:
-                    try: stdscr.addch(oy, ox, OBSTACLE_SYMBOL, obstacle_attrib)
-                    except curses.error: pass
+                 frame_put(oy, ox, OBSTACLE_SYMBOL, ATTR_OBSTACLE)
         elif effect_type == 7: # Meteors
-            for meteor in effect_data.get('meteors', []):
-                mx, my = meteor['pos']
-                if 0 <= my < sh and 0 <= mx < sw:
-                     # Avoid drawing over maze walls? Let them phase.
-                     # if (mx, my) not in maze_walls_drawn:
-                        try: stdscr.addch(my, mx, METEOR_SYMBOL, meteor_attrib)
-                        except curses.error: pass
+            for mx, my in zip(effect_data.get('meteor_xs', ()), effect_data.get('meteor_ys', ())):
+                # Avoid drawing over maze walls? Let them phase.
+                frame_put(my, mx, METEOR_SYMBOL, ATTR_METEOR)
         # Type 8 (Maze) walls/food drawn already
 
 # --- Power-up Activation Logic ---
 def activate_powerup(ptype, current_loop_time, stdscr, snake, current_timeout,
-                     base_difficulty_timeout, powerup_slowdown_factor, difficulty_key, has_colors):
-    """Handles activation logic. Returns new timeout. Sets flash message."""
+                     base_difficulty_timeout, powerup_slowdown_factor, difficulty_key, has_colors, screen_dims=None):
+    """Handles activation logic. Returns new timeout. Sets flash message.
+
+    screen_dims, an (sh, sw) tuple, saves a getmaxyx() call when the caller has it.
+    """
     global active_effects, score, type1_food_spawn_count, ball_powerup_count
     global maze_food_items, foods, power_ups_on_screen
     global flash_message, flash_message_end_time
@@ -795,7 +1126,7 @@ def activate_powerup(ptype, current_loop_time, stdscr, snake, current_timeout,
         return current_timeout
 
 
-    sh, sw = stdscr.getmaxyx()
+    sh, sw = screen_dims or stdscr.getmaxyx()
 
     # Determine duration (remains the same for Type 5)
     effect_duration = 0
@@ -821,41 +1152,28 @@ def activate_powerup(ptype, current_loop_time, stdscr, snake, current_timeout,
         current_timeout = min(MAX_TIMEOUT, current_timeout + timeout_increase)
         stdscr.timeout(current_timeout) # Apply slowdown
 
-        foods.clear() # Clear existing regular food
-        all_items_to_avoid = list(snake) + power_ups_on_screen
-        all_items_to_avoid.extend(list(set().union(*(eff['data'].get('blocks', set()) for eff in active_effects if eff['type'] == 6)))) # Obstacles
-        all_items_to_avoid.extend(list(set().union(*(eff['data'].get('maze_walls', set()) for eff in active_effects if eff['type'] == 8)))) # Maze Walls
-
-        spawned_count = 0
-        for _ in range(type1_food_spawn_count):
-            new_food_pos = place_item(stdscr, snake, all_items_to_avoid)
-            if new_food_pos:
-                foods.append(new_food_pos)
-                all_items_to_avoid.append(new_food_pos)
-                spawned_count += 1
-            else: break
-        if spawned_count == 0 and type1_food_spawn_count > 0:
+        vacate(foods, OCC_FOOD); foods.clear() # Clear existing regular food
+        # Power-ups, obstacles, maze walls and already-spawned food are avoided via the occupancy bitmap
+
+        new_foods = place_items(stdscr, snake, type1_food_spawn_count, screen_dims=(sh, sw)) # One batched draw
+        foods.extend(new_foods); occupy(new_foods, OCC_FOOD)
+        if not new_foods and type1_food_spawn_count > 0:
             print("Warning: No food spawned for Type 1 activation.", file=sys.stderr)
 
     elif ptype == 2: # Bouncing Balls
         ball_powerup_count += 1
-        new_effect['data']['balls'] = []
-        all_items_to_avoid = list(snake) + foods + power_ups_on_screen
-        all_items_to_avoid.extend(list(set().union(*(eff['data'].get('blocks', set()) for eff in active_effects if eff['type'] == 6)))) # Obstacles
-        all_items_to_avoid.extend(list(set().union(*(eff['data'].get('maze_walls', set()) for eff in active_effects if eff['type'] == 8)))) # Maze Walls
+        ball_xs = []; ball_ys = []; ball_dxs = []; ball_dys = []
+        new_effect['data'].update({'ball_xs': ball_xs, 'ball_ys': ball_ys, 'ball_dxs': ball_dxs, 'ball_dys': ball_dys})
+        all_items_to_avoid = set() # Food, power-ups, obstacles and maze walls are in the occupancy bitmap
         for eff in active_effects:
-             if eff['type'] == 2: all_items_to_avoid.extend([b['pos'] for b in eff['data'].get('balls',[])])
-
-        spawned_count = 0
-        for _ in range(ball_powerup_count): # Spawn cumulative number of balls
-            ball_start_pos = place_item(stdscr, snake, all_items_to_avoid)
-            if ball_start_pos:
-                ball_vel = random.choice([(1,1), (1,-1), (-1,1), (-1,-1)])
-                new_effect['data']['balls'].append({'pos': ball_start_pos, 'vel': ball_vel})
-                all_items_to_avoid.append({'pos': ball_start_pos})
-                spawned_count += 1
-            else: break
-        if spawned_count == 0 and ball_powerup_count > 0:
+             if eff['type'] == 2: all_items_to_avoid.update(zip(eff['data'].get('ball_xs', ()), eff['data'].get('ball_ys', ())))
+
+        # Spawn cumulative number of balls, all drawn from one free-cell scan
+        ball_starts = place_items(stdscr, snake, ball_powerup_count, screen_dims=(sh, sw), existing_items=all_items_to_avoid)
+        ball_vels = random.choices(((1,1), (1,-1), (-1,1), (-1,-1)), k=len(ball_starts))
+        for (bx, by), (bdx, bdy) in zip(ball_starts, ball_vels):
+            ball_xs.append(bx); ball_ys.append(by); ball_dxs.append(bdx); ball_dys.append(bdy)
+        if not ball_starts and ball_powerup_count > 0:
             print("Warning: No balls spawned for Type 2 activation.", file=sys.stderr)
             activation_successful = False
 
@@ -902,20 +1220,16 @@ def activate_powerup(ptype, current_loop_time, stdscr, snake, current_timeout,
             tail_dx, tail_dy = 1, 0 # Tail goes right (positive x)
 
         # Generate the initial segments, starting with head, extending off-screen
-        enemy_segments = [(sx, sy)] # Start with the head segment
-        last_seg_x, last_seg_y = sx, sy
-        for _ in range(target_length - 1):
-            next_seg_x = last_seg_x + tail_dx
-            next_seg_y = last_seg_y + tail_dy
-            enemy_segments.append((next_seg_x, next_seg_y))
-            last_seg_x, last_seg_y = next_seg_x, next_seg_y
+        enemy_segments = [(sx + tail_dx * k, sy + tail_dy * k) for k in range(target_length)] # Head is k = 0
 
         # Determine internal target position (ix, iy) - Same as before
         ix, iy = random.randint(sw//4, 3*sw//4), random.randint(sh//4, 3*sh//4)
+        if active_effect_counts[8]: # Inside a maze, keep the target reachable from the entry point
+            ix, iy = reachable_target((sx, sy)) or (ix, iy)
 
         # Initial state for the new enemy - now with the full segment list
         new_effect['data'] = {
-            'snake': enemy_segments, # List of segments
+            'snake': SnakeBody(enemy_segments), # Segments, head first
             'target': (ix, iy),
             'state': 'seeking_internal',
             'enemy_type': enemy_type_name # Optional: store type if needed later
@@ -924,45 +1238,31 @@ def activate_powerup(ptype, current_loop_time, stdscr, snake, current_timeout,
 
     elif ptype == 6: # Obstacle Blocks
         num_obstacles = max(1, len(snake) // 2)
-        placed_obstacles = []
-        all_items_to_avoid = list(snake) + foods + power_ups_on_screen
-        current_obstacles_coords = set().union(*(eff['data'].get('blocks', set()) for eff in active_effects if eff['type'] == 6))
-        all_items_to_avoid.extend(list(current_obstacles_coords))
-        all_items_to_avoid.extend(list(set().union(*(eff['data'].get('maze_walls', set()) for eff in active_effects if eff['type'] == 8))))
-
-        for _ in range(num_obstacles):
-            pos = place_item(stdscr, snake, all_items_to_avoid, max_attempts=MAX_OBSTACLE_PLACEMENT_ATTEMPTS)
-            if pos:
-                placed_obstacles.append(pos)
-                all_items_to_avoid.append(pos)
-            else:
-                print(f"Warning: Placed {len(placed_obstacles)}/{num_obstacles} obstacles. No more space?", file=sys.stderr)
-                break
+        # Existing food/power-ups/obstacles/walls are in the occupancy bitmap, so
+        # all blocks come from a single sample of the free cells
+        placed_obstacles = place_items(stdscr, snake, num_obstacles, screen_dims=(sh, sw))
+        if len(placed_obstacles) < num_obstacles:
+            print(f"Warning: Placed {len(placed_obstacles)}/{num_obstacles} obstacles. No more space?", file=sys.stderr)
 
         min_required_obstacles = max(1, num_obstacles // 2) if num_obstacles > 0 else 0
         if num_obstacles > 0 and len(placed_obstacles) < min_required_obstacles:
             score = max(0, score + PENALTY_OBSTACLE_FAIL)
-            if len(snake) > 1:
-                segments_to_remove = max(1, len(snake) // 4)
-                for _ in range(segments_to_remove):
-                    if len(snake) > 1: snake.pop()
-                    else: break
+            if len(snake) > 1: snake.shed(max(1, len(snake) // 4))
             activation_successful = False
             flash_message = "Obstacle Fail! Penalty!"
             flash_message_end_time = current_loop_time + FLASH_MESSAGE_DURATION
             print(f"Obstacle placement failed ({len(placed_obstacles)}/{num_obstacles}), penalty applied.", file=sys.stderr)
         elif placed_obstacles:
-            new_effect['data']['blocks'] = set(placed_obstacles)
+            new_effect['data']['blocks'] = frozenset(placed_obstacles)
         else:
             activation_successful = False
 
     elif ptype == 7: # Meteor Rain
         num_meteors = random.randint(max(1, sw // 15), max(3, sw // 10))
-        new_effect['data']['meteors'] = []
-        for _ in range(num_meteors):
-            m_start_x = random.randint(1, sw - 2)
-            m_dx = random.choice([-1, 0, 0, 1])
-            new_effect['data']['meteors'].append({'pos': (m_start_x, 0), 'vel': (m_dx, 1)})
+        meteor_xs = [random.randrange(1, sw - 1) for _ in range(num_meteors)]
+        meteor_dxs = random.choices((-1, 0, 0, 1), k=num_meteors) # Drift, mostly straight down
+        new_effect['data'].update({'meteor_xs': meteor_xs, 'meteor_ys': [0] * num_meteors,
+                                   'meteor_dxs': meteor_dxs, 'meteor_dys': [1] * num_meteors})
 
     elif ptype == 8: # Wide Maze
         max_maze_cells = int((sh - 2) * (sw - 2) * MAZE_AREA_PERCENTAGE)
@@ -980,14 +1280,11 @@ def activate_powerup(ptype, current_loop_time, stdscr, snake, current_timeout,
             offset_y = max(1, (sh - target_h) // 2)
             offset_x = max(1, (sw - target_w) // 2)
 
-            rel_maze_walls, rel_expanded_path, rel_entrance, rel_exit = \
-                generate_wide_maze(target_h, target_w, MAZE_CORRIDOR_WIDTH)
+            # Generated directly in screen coordinates
+            offset_maze_walls, offset_expanded_path, offset_entrance, offset_exit = \
+                generate_wide_maze(target_h, target_w, MAZE_CORRIDOR_WIDTH, origin=(offset_x, offset_y))
 
-            if rel_expanded_path:
-                offset_maze_walls = set((cx + offset_x, cy + offset_y) for cx, cy in rel_maze_walls)
-                offset_expanded_path = set((cx + offset_x, cy + offset_y) for cx, cy in rel_expanded_path)
-                offset_entrance = (rel_entrance[0] + offset_x, rel_entrance[1] + offset_y) if rel_entrance else None
-                offset_exit = (rel_exit[0] + offset_x, rel_exit[1] + offset_y) if rel_exit else None
+            if offset_expanded_path:
 
                 head_pos = snake[0]
                 if head_pos in offset_maze_walls:
@@ -998,9 +1295,10 @@ def activate_powerup(ptype, current_loop_time, stdscr, snake, current_timeout,
                 current_timeout = min(MAX_TIMEOUT, int(current_timeout * MAZE_SLOWDOWN_FACTOR))
                 stdscr.timeout(current_timeout)
 
-                items_to_avoid_maze_food = list(snake) + power_ups_on_screen
-                available_offset_path_list = list(offset_expanded_path - set(items_to_avoid_maze_food))
-                maze_food_items.clear()
+                # Skip path cells under the snake, power-ups or obstacles
+                available_offset_path_list = [cell for cell in offset_expanded_path - set(snake)
+                                              if not occupancy_at(*cell) & (OCC_POWERUP | OCC_OBSTACLE)]
+                vacate(maze_food_items, OCC_MAZE_FOOD); maze_food_items.clear()
 
                 if not available_offset_path_list:
                     print("Warning: Maze generated, but no valid path cells for food.", file=sys.stderr)
@@ -1011,13 +1309,14 @@ def activate_powerup(ptype, current_loop_time, stdscr, snake, current_timeout,
                     try:
                         maze_food_coords_offset = random.sample(available_offset_path_list, num_maze_food)
                         maze_food_items.extend(maze_food_coords_offset)
+                        occupy(maze_food_coords_offset, OCC_MAZE_FOOD)
                     except ValueError as e:
                          print(f"Error sampling maze food positions: {e}", file=sys.stderr)
 
-                new_effect['data']['maze_walls'] = offset_maze_walls
+                new_effect['data']['maze_walls'] = frozenset(offset_maze_walls)
                 new_effect['data']['maze_entrance'] = offset_entrance
                 new_effect['data']['maze_exit'] = offset_exit
-                foods.clear()
+                vacate(foods, OCC_FOOD); foods.clear()
                 maze_just_activated = True
             else:
                 activation_successful = False
@@ -1028,7 +1327,8 @@ def activate_powerup(ptype, current_loop_time, stdscr, snake, current_timeout,
 
     # --- Finalize Activation ---
     if activation_successful:
-        active_effects.append(new_effect)
+        active_effects.append(new_effect); active_effect_counts[ptype] += 1
+        occupy_effect(new_effect)
         if not flash_message: # Don't overwrite failure messages
              flash_message = POWERUP_NAMES.get(ptype, f"Power Up Type {ptype}!")
              # Use shorter duration for enemy spawn message?
@@ -1038,7 +1338,7 @@ def activate_powerup(ptype, current_loop_time, stdscr, snake, current_timeout,
 
     else: # Activation failed or was cancelled
          if ptype == 8: maze_just_activated = False
-         if ptype in [1, 4, 8] and 'original_timeout' in new_effect['data']:
+         if ptype in TIMEOUT_MODIFYING_EFFECTS and 'original_timeout' in new_effect['data']:
               current_timeout = new_effect['data']['original_timeout']
               stdscr.timeout(current_timeout)
          print(f"Powerup type {ptype} activation cancelled or failed.", file=sys.stderr)
@@ -1058,11 +1358,11 @@ def reset_game_state():
     global foods, power_ups_on_screen, flash_message, flash_message_end_time
     global last_flash_time, flash_on, maze_just_activated
 
-    score = 0; active_effects = []; ball_powerup_count = 0
-    type1_food_spawn_count = 3; last_type1_decrement_time = time.time()
+    score = 0; active_effects = []; active_effect_counts.clear(); ball_powerup_count = 0
+    type1_food_spawn_count = 3; last_type1_decrement_time = time.monotonic()
     key_press_history.clear(); maze_food_items = []; foods = []
     power_ups_on_screen = []; flash_message = None; flash_message_end_time = 0
-    flash_on = False; last_flash_time = time.time(); maze_just_activated = False
+    flash_on = False; last_flash_time = time.monotonic(); maze_just_activated = False
 
 # --- Main Game Function ---
 def main(stdscr, test_mode=False):
@@ -1071,6 +1371,7 @@ def main(stdscr, test_mode=False):
     global key_press_history, maze_food_items, foods, power_ups_on_screen
     global flash_message, flash_message_end_time
     global maze_just_activated # Need global scope for the freeze flag
+    global tick_time
 
     # --- Initial Setup ---
     curses.curs_set(0); stdscr.nodelay(True); stdscr.keypad(True)
@@ -1084,8 +1385,7 @@ def main(stdscr, test_mode=False):
         return
 
     has_colors = init_colors()
-    flash_message_attrib = curses.color_pair(SNAKE_FLASH_PAIR) | curses.A_BOLD if has_colors else curses.A_BOLD
-    maze_snake_attrib = curses.color_pair(MAZE_SNAKE_PAIR) | curses.A_BOLD if has_colors else curses.A_BOLD
+    init_attrs(has_colors)
 
     # --- Difficulty Selection ---
     difficulty, difficulty_key = select_difficulty(stdscr, has_colors)
@@ -1100,44 +1400,45 @@ def main(stdscr, test_mode=False):
     while play_again:
 
         reset_game_state() # Reset globals for a fresh game
+        init_occupancy(sh, sw); init_frame(sh, sw)
         current_timeout = base_difficulty_timeout
         stdscr.timeout(current_timeout)
 
         # Initial snake setup
         start_x, start_y = sw // 4, sh // 2
-        snake = [(start_x, start_y), (start_x - 1, start_y), (start_x - 2, start_y)]
+        snake = SnakeBody([(start_x, start_y), (start_x - 1, start_y), (start_x - 2, start_y)]) # O(1) head insert / tail pop / membership
         direction = curses.KEY_RIGHT
 
         # Initial food placement
-        initial_food_pos = place_item(stdscr, snake, [])
-        if initial_food_pos: foods.append(initial_food_pos)
+        initial_food_pos = place_item(stdscr, snake, [], screen_dims=(sh, sw))
+        if initial_food_pos: foods.append(initial_food_pos); occupy((initial_food_pos,), OCC_FOOD)
         else: print("Warning: Could not place initial food. Terminal might be too small.", file=sys.stderr)
 
         # Power-up timing
-        next_power_up_spawn_time = time.time() + random.uniform(15, 45) # Spawn first one a bit sooner
+        next_power_up_spawn_time = time.monotonic() + random.uniform(15, 45) # Spawn first one a bit sooner
 
         # --- Test Mode Activation ---
         if test_mode:
             print("--- TEST MODE: Activating all powerups ---", file=sys.stderr)
-            current_activate_time = time.time()
+            current_activate_time = time.monotonic()
             test_mode_maze_activated = False # Track if maze activated in test
             for ptype_test in sorted(POWERUP_TYPES):
                 print(f"Activating test powerup: {POWERUP_NAMES.get(ptype_test, ptype_test)} ({ptype_test})", file=sys.stderr)
                 # Store current state before activation
-                was_active = any(e['type'] == ptype_test for e in active_effects)
+                was_active = active_effect_counts[ptype_test] > 0
                 prev_timeout = current_timeout
                 prev_maze_just_activated = maze_just_activated
 
                 current_timeout = activate_powerup(
                     ptype_test, current_activate_time, stdscr, snake,
                     current_timeout, base_difficulty_timeout, powerup_slowdown_factor,
-                    difficulty_key, has_colors
+                    difficulty_key, has_colors, screen_dims=(sh, sw)
                 )
                 stdscr.timeout(current_timeout) # Ensure timeout is updated immediately
 
                 # Check if activation was successful and if it was maze type 8
-                is_now_active = any(e['type'] == ptype_test for e in active_effects)
-                powerup_actually_activated = is_now_active and (not was_active or ptype_test in [1, 2]) # Types 1,2 stack
+                is_now_active = active_effect_counts[ptype_test] > 0
+                powerup_actually_activated = is_now_active and (not was_active or ptype_test in (1, 2)) # Types 1,2 stack
                 maze_triggered_this_activation = (ptype_test == 8 and maze_just_activated and not prev_maze_just_activated)
 
                 if maze_triggered_this_activation:
@@ -1152,19 +1453,15 @@ def main(stdscr, test_mode=False):
             if test_mode_maze_activated:
                 print(f"Test Mode: Freezing for {MAZE_INITIAL_FREEZE_S}s after activations...", file=sys.stderr)
                 # Perform a draw before sleeping to show the initial state
-                stdscr.clear()
+                frame_clear()
                 # Draw relevant elements: snake, effects (including maze), maybe status
                 status_line = f"Score: {score} | Speed: {current_timeout}ms | Len: {len(snake)}"
-                try: stdscr.addstr(0, 1, status_line[:sw-1])
-                except curses.error: pass
-                draw_active_effects(stdscr, has_colors) # Draw maze walls/food etc.
+                frame_text(0, 1, status_line[:sw-1])
+                draw_active_effects(stdscr) # Draw maze walls/food etc.
                 if snake: # Draw snake
-                     snake_attrib = curses.color_pair(MAZE_SNAKE_PAIR) if has_colors else 0
-                     for seg_x, seg_y in snake:
-                          if 0 <= seg_y < sh and 0 <= seg_x < sw:
-                              try: stdscr.addch(seg_y, seg_x, SNAKE_SYMBOL, snake_attrib)
-                              except curses.error: pass
+                     for seg_x, seg_y in snake: frame_put(seg_y, seg_x, SNAKE_SYMBOL, ATTR_SNAKE_MAZE)
 
+                frame_flush(stdscr)
                 stdscr.refresh()
                 time.sleep(MAZE_INITIAL_FREEZE_S)
                 curses.flushinp() # Clear any input buffer during freeze
@@ -1175,27 +1472,24 @@ def main(stdscr, test_mode=False):
 
         # --- Inner Game Loop ---
         game_over = False; quit_game = False
+        tick_deadline_ns = time.monotonic_ns() # Monotonic end of the previous tick
         while not game_over and not quit_game:
-            current_loop_time = time.time()
+            current_loop_time = tick_time = time.monotonic() # The one clock read for this tick
             grew_from_eating = False # Reset growth flag each tick
 
             # Handle Maze Initial Freeze (set during activation)
             if maze_just_activated:
                 # Need to draw the state *before* sleeping
-                stdscr.clear()
+                frame_clear()
                 # Status Line
                 status_line = f"Score: {score} | Speed: {current_timeout}ms | Len: {len(snake)}"
-                try: stdscr.addstr(0, 1, status_line[:sw-1])
-                except curses.error: pass
+                frame_text(0, 1, status_line[:sw-1])
                 # Draw maze walls/food etc.
-                draw_active_effects(stdscr, has_colors)
+                draw_active_effects(stdscr)
                  # Draw snake (should be yellow now)
                 if snake:
-                    snake_attrib = curses.color_pair(MAZE_SNAKE_PAIR)|curses.A_BOLD if has_colors else curses.A_BOLD
-                    for seg_x, seg_y in snake:
-                        if 0 <= seg_y < sh and 0 <= seg_x < sw:
-                            try: stdscr.addch(seg_y, seg_x, SNAKE_SYMBOL, snake_attrib)
-                            except curses.error: pass
+                    for seg_x, seg_y in snake: frame_put(seg_y, seg_x, SNAKE_SYMBOL, ATTR_SNAKE_MAZE)
+                frame_flush(stdscr)
                 stdscr.refresh()
 
                 time.sleep(MAZE_INITIAL_FREEZE_S)
@@ -1204,12 +1498,16 @@ def main(stdscr, test_mode=False):
 
 
             # 1. Input Handling
-            key = stdscr.getch(); new_direction = direction
-            valid_key_pressed = False
-            if key == curses.KEY_LEFT and direction != curses.KEY_RIGHT: new_direction = curses.KEY_LEFT; valid_key_pressed = True
-            elif key == curses.KEY_RIGHT and direction != curses.KEY_LEFT: new_direction = curses.KEY_RIGHT; valid_key_pressed = True
-            elif key == curses.KEY_UP and direction != curses.KEY_DOWN: new_direction = curses.KEY_UP; valid_key_pressed = True
-            elif key == curses.KEY_DOWN and direction != curses.KEY_UP: new_direction = curses.KEY_DOWN; valid_key_pressed = True
+            # getch waits out whatever is left of this tick (current_timeout after the
+            # previous deadline), so update/draw time doesn't stretch the tick. When
+            # behind, the deadline restarts from now instead of bursting to catch up;
+            # after a key press ended the last wait early it is capped at one tick from now.
+            now_ns = time.monotonic_ns(); tick_ns = current_timeout * 1_000_000
+            tick_deadline_ns = min(max(tick_deadline_ns + tick_ns, now_ns), now_ns + tick_ns)
+            stdscr.timeout((tick_deadline_ns - now_ns) // 1_000_000)
+            key = stdscr.getch()
+            # Arrow keys turn the snake unless they'd reverse it (a reversing key falls through and clears the history)
+            if key in OPPOSITE_DIRECTIONS and OPPOSITE_DIRECTIONS[key] != direction: direction = key
             elif key == ord('q'): quit_game = True; continue
             elif key == ord('p'): # Pause functionality
                  stdscr.nodelay(False) # Turn off non-blocking input
@@ -1218,6 +1516,7 @@ def main(stdscr, test_mode=False):
                  stdscr.addstr(msg_y, msg_x, pause_msg, curses.A_BOLD)
                  stdscr.refresh()
                  while stdscr.getch() != ord('p'): pass
+                 frame_invalidate() # The pause message was drawn outside the frame buffer
                  stdscr.nodelay(True) # Turn back on non-blocking
                  curses.flushinp() # Clear buffer after pause
 
@@ -1225,15 +1524,13 @@ def main(stdscr, test_mode=False):
             elif key == ord('x'): key_press_history.append('x')
             elif key != -1: key_press_history.clear() # Clear history on any other key press
 
-            if valid_key_pressed: direction = new_direction
-
             # 2. Secret Code Activation ('xxx')
-            is_maze_already_active_check = any(eff['type'] == 8 for eff in active_effects)
-            if list(key_press_history) == ['x', 'x', 'x'] and not is_maze_already_active_check:
+            is_maze_already_active_check = active_effect_counts[8] > 0
+            if len(key_press_history) == 3 and not is_maze_already_active_check: # Only 'x' is recorded (maxlen 3)
                 # Temporarily store current state flags that activate_powerup might change
                 was_maze_just_activated = maze_just_activated
 
-                current_timeout = activate_powerup(8, current_loop_time, stdscr, snake, current_timeout, base_difficulty_timeout, powerup_slowdown_factor, difficulty_key, has_colors)
+                current_timeout = activate_powerup(8, current_loop_time, stdscr, snake, current_timeout, base_difficulty_timeout, powerup_slowdown_factor, difficulty_key, has_colors, screen_dims=(sh, sw))
 
                 # maze_just_activated flag is set inside activate_powerup if successful
                 stdscr.timeout(current_timeout)
@@ -1242,9 +1539,8 @@ def main(stdscr, test_mode=False):
 
             # 3. Update Active Power-up Effects & Get Current State
             # This updates positions, checks expirations, handles collisions internal to effects
-            current_timeout, is_any_effect_active, is_thick_active, \
-            active_obstacles, active_maze_walls, is_maze_active = \
-                update_active_effects(stdscr, snake, current_timeout, base_difficulty_timeout)
+            current_timeout, is_any_effect_active, is_thick_active, active_maze_walls, is_maze_active = \
+                update_active_effects(stdscr, snake, current_timeout, base_difficulty_timeout, screen_dims=(sh, sw))
             stdscr.timeout(current_timeout) # Apply timeout changes from effects
 
             # 4. Check for Game Over from Effects (e.g., snake shrunk to nothing)
@@ -1254,56 +1550,27 @@ def main(stdscr, test_mode=False):
             snake_attrib = 0
             if has_colors:
                 if is_maze_active: # Maze takes priority
-                    snake_attrib = maze_snake_attrib
+                    snake_attrib = ATTR_SNAKE_MAZE
                 elif is_any_effect_active: # Flash if any other effect active
                     if current_loop_time - last_flash_time > FLASH_INTERVAL:
                          flash_on = not flash_on; last_flash_time = current_loop_time
-                    snake_attrib = curses.color_pair(SNAKE_FLASH_PAIR if flash_on else DEFAULT_PAIR)
+                    snake_attrib = ATTR_SNAKE_FLASH if flash_on else ATTR_DEFAULT
                 else: # Default color
-                    snake_attrib = curses.color_pair(DEFAULT_PAIR); flash_on = False # Ensure flash stops
+                    snake_attrib = ATTR_DEFAULT; flash_on = False # Ensure flash stops
             else: # No colors
                  snake_attrib = 0
 
 
-            # 6. Calculate Snake's Next Head Position
+            # 6-7. Calculate the Next Head and Check Collisions (Wall, Self, Obstacles, Maze Walls)
             # Need snake check again, as update_effects might have killed it
             if not snake: game_over = True; continue
-            head_x, head_y = snake[0]
-            next_head_x, next_head_y = head_x, head_y # Start with current head
-
-            if direction == curses.KEY_RIGHT: next_head_x += 1
-            elif direction == curses.KEY_LEFT: next_head_x -= 1
-            elif direction == curses.KEY_UP: next_head_y -= 1
-            elif direction == curses.KEY_DOWN: next_head_y += 1
-
-            new_head = (next_head_x, next_head_y)
-
-            # 7. Check Collisions (Wall, Self, Obstacles, Maze Walls)
-            # --- IMPORTANT: Check collisions BEFORE moving snake ---
-            # Check screen boundary collision
-            # Note: Maze openings are now at 1/dim-2, so hitting 0/dim-1 is always game over
-            wall_hit = next_head_x < 0 or next_head_x >= sw or next_head_y < 0 or next_head_y >= sh
-
-            # Check self collision (new head position against existing body)
-            # Need slicing snake[1:] if thick snake extra part can overlap tail
-            self_collision = len(snake) > 1 and new_head in snake # Check against entire snake before move
-
-            # Check collision with active obstacles
-            obstacle_hit = new_head in active_obstacles
-
-            # Check collision with active maze walls
-            # active_maze_walls is updated in update_active_effects
-            maze_wall_hit = new_head in active_maze_walls
-
-            if wall_hit or self_collision or obstacle_hit or maze_wall_hit:
-                # Optional: Identify cause for debug/message
-                # cause = "Wall" if wall_hit else "Self" if self_collision else "Obstacle" if obstacle_hit else "Maze Wall"
-                # print(f"Game Over: Collision detected - {cause} at {new_head}", file=sys.stderr)
+            new_head, step_event = step_snake(snake, direction, is_maze_active)
+            if step_event == STEP_DIED:
                 game_over = True; continue # Skip movement and drawing for this frame
 
 
             # 8. Move Snake (Add new head)
-            snake.insert(0, new_head)
+            snake.appendleft(new_head)
 
             # 9. Food Consumption (Regular and Maze Food)
             consumed_food_pos = None
@@ -1314,15 +1581,13 @@ def main(stdscr, test_mode=False):
             food_list_to_check = maze_food_items if is_maze_active else foods
             food_score_value = SCORE_MAZE_FOOD if is_maze_active else SCORE_FOOD
 
-            # Check head collision with food
+            # Head collision with food was already resolved by step_snake
             food_to_remove_index = -1
-            for i, food_pos in enumerate(food_list_to_check):
-                if new_head == food_pos:
-                    consumed_food_pos = food_pos
-                    food_score_increase = food_score_value
-                    is_maze_food_consumed = is_maze_active
-                    food_to_remove_index = i
-                    break
+            if step_event != STEP_MOVED:
+                consumed_food_pos = new_head
+                food_score_increase = food_score_value
+                is_maze_food_consumed = step_event == STEP_ATE_MAZE
+                food_to_remove_index = food_list_to_check.index(new_head)
 
             # --- Thick Snake Food Collision Check ---
             if not consumed_food_pos and is_thick_active and len(snake) > 1:
@@ -1342,15 +1607,13 @@ def main(stdscr, test_mode=False):
 
                  adj_pos = (adj_x, adj_y)
 
-                 # Check if this adjacent position hits food
-                 for i, food_pos in enumerate(food_list_to_check):
-                      if adj_pos == food_pos:
-                           consumed_food_pos = food_pos
-                           food_score_increase = food_score_value
-                           is_maze_food_consumed = is_maze_active
-                           food_to_remove_index = i
-                           print(f"Debug: Thick snake ate food at {food_pos} via segment {adj_pos}", file=sys.stderr)
-                           break
+                 # Check if this adjacent position hits food (bitmap probe; the list is only searched on a hit)
+                 if occupancy_at(adj_x, adj_y) & (OCC_MAZE_FOOD if is_maze_active else OCC_FOOD):
+                      consumed_food_pos = adj_pos
+                      food_score_increase = food_score_value
+                      is_maze_food_consumed = is_maze_active
+                      food_to_remove_index = food_list_to_check.index(adj_pos)
+                      print(f"Debug: Thick snake ate food at {adj_pos} via its extra segment", file=sys.stderr)
 
 
             # Process food consumption if any occurred
@@ -1360,17 +1623,18 @@ def main(stdscr, test_mode=False):
 
                 # Remove the eaten food
                 if food_to_remove_index != -1:
-                    del food_list_to_check[food_to_remove_index]
+                    # Order doesn't matter, so swap the last item into the hole instead of shifting the tail
+                    food_list_to_check[food_to_remove_index] = food_list_to_check[-1]; food_list_to_check.pop()
+                    vacate((consumed_food_pos,), OCC_MAZE_FOOD if is_maze_food_consumed else OCC_FOOD)
 
                 # Speed up only if it was REGULAR food (not maze food)
                 if not is_maze_food_consumed:
                     timeout_reduction = int(current_timeout * speed_increase_factor)
                     current_timeout = max(MIN_TIMEOUT, current_timeout - timeout_reduction)
                     stdscr.timeout(current_timeout)
-                    # Spawn new *regular* food
-                    all_items_on_screen = foods + power_ups_on_screen + list(active_obstacles) + maze_food_items + list(active_maze_walls)
-                    new_food_pos = place_item(stdscr, snake, all_items_on_screen)
-                    if new_food_pos: foods.append(new_food_pos)
+                    # Spawn new *regular* food (other items are avoided via the occupancy bitmap)
+                    new_food_pos = place_item(stdscr, snake, [], screen_dims=(sh, sw))
+                    if new_food_pos: foods.append(new_food_pos); occupy((new_food_pos,), OCC_FOOD)
                     else: print("Warning: Could not place new regular food after eating.", file=sys.stderr)
                 # else: No speed up for maze food, and don't spawn new maze food here (handled by initial spawn)
 
@@ -1390,13 +1654,14 @@ def main(stdscr, test_mode=False):
 
                 if consumed_powerup_type != -1:
                     del power_ups_on_screen[powerup_to_remove_index]
+                    vacate((new_head,), OCC_POWERUP)
                     # Activate the consumed powerup
                     # Need to track if maze was just activated for the freeze
                     prev_maze_just_activated = maze_just_activated
                     current_timeout = activate_powerup(
                         consumed_powerup_type, current_loop_time, stdscr, snake,
                         current_timeout, base_difficulty_timeout, powerup_slowdown_factor,
-                        difficulty_key, has_colors
+                        difficulty_key, has_colors, screen_dims=(sh, sw)
                     )
                     # maze_just_activated flag is set inside activate_powerup
                     stdscr.timeout(current_timeout)
@@ -1414,25 +1679,21 @@ def main(stdscr, test_mode=False):
                 max_powerups = 5 # Limit number on screen
                 if len(power_ups_on_screen) < max_powerups:
                     ptype = random.choice(POWERUP_TYPES)
-                    # Avoid placing on walls, food, other powerups, obstacles, snake
-                    all_items = foods + power_ups_on_screen + list(active_obstacles) + list(active_maze_walls) # Include maze walls even if inactive? No, only if active.
-                    # But powerups only spawn when maze *not* active, so no need for maze walls here.
-                    all_items = foods + power_ups_on_screen + list(active_obstacles)
-
-                    pos = place_item(stdscr, snake, all_items)
-                    if pos: power_ups_on_screen.append((*pos, ptype))
+                    # Avoid placing on the snake; walls, food, other powerups and obstacles
+                    # are avoided via the occupancy bitmap
+                    pos = place_item(stdscr, snake, [], screen_dims=(sh, sw))
+                    if pos: power_ups_on_screen.append((*pos, ptype)); occupy((pos,), OCC_POWERUP)
                 # Schedule next spawn time
                 next_power_up_spawn_time = current_loop_time + random.uniform(15, 45) # Adjust timing range
 
 
             # --- 13. Drawing ---
-            stdscr.clear()
+            frame_clear()
 
             # Status Line
             snake_len = len(snake) if snake else 0
             status_line = f"Score: {score} | Speed: {current_timeout}ms | Len: {snake_len}"
-            try: stdscr.addstr(0, 1, status_line[:sw-1])
-            except curses.error: pass # Ignore drawing errors at edge
+            frame_text(0, 1, status_line[:sw-1])
 
             # Effect Countdowns
             countdown_row = 1
@@ -1449,77 +1710,39 @@ def main(stdscr, test_mode=False):
 
             for info_line in active_timed_effects_info:
                  if countdown_row < sh -1: # Ensure doesn't overwrite bottom edge
-                    try: stdscr.addstr(countdown_row, 1, info_line[:sw-1])
-                    except curses.error: pass
+                    frame_text(countdown_row, 1, info_line[:sw-1])
                     countdown_row += 1
                  else: break
 
             # Draw Active Effects (Maze walls/food, obstacles, enemies, meteors, balls)
             # This draws the "background" elements for the frame
-            draw_active_effects(stdscr, has_colors)
+            draw_active_effects(stdscr)
 
             # Draw Regular Food (only if maze is not active)
             if not is_maze_active:
-                food_attrib = curses.color_pair(FOOD_PAIR) if has_colors else 0
-                for fx, fy in foods:
-                    # Avoid drawing food over maze walls if they exist but aren't "active" (shouldn't happen often)
-                    if (fx, fy) not in active_maze_walls:
-                        if 0 <= fy < sh and 0 <= fx < sw:
-                            try: stdscr.addch(fy, fx, FOOD_SYMBOL, food_attrib)
-                            except curses.error: pass
+                for fx, fy in foods: # No maze is active here, so there are no walls to avoid
+                    frame_put(fy, fx, FOOD_SYMBOL, ATTR_FOOD)
 
             # Draw Powerup Pickups (?)
             for px, py, ptype in power_ups_on_screen:
-                 # Determine symbol and color based on type
-                 pup_symbol = UNIFIED_POWERUP_SYMBOL
-                 pup_color_id_name = f"POWERUP_TYPE_{ptype}_PAIR"
-                 # Use specific colors for types that have distinct visual elements
-                 if ptype == 6: pup_color_id_name = "OBSTACLE_PAIR"
-                 elif ptype == 7: pup_color_id_name = "METEOR_PAIR"
-                 elif ptype == 8: pup_color_id_name = "MAZE_FOOD_PAIR" # Use maze color for pickup trigger too
-
-                 # Fallback to default pair if specific pair name doesn't exist
-                 pup_color_id = globals().get(pup_color_id_name, DEFAULT_PAIR)
-                 pup_attrib = curses.color_pair(pup_color_id) if has_colors else 0
-
-                 # Avoid drawing pickup over maze walls
+                 # Avoid drawing pickup over maze walls (color per type resolved by init_attrs)
                  if (px, py) not in active_maze_walls:
-                     if 0 <= py < sh and 0 <= px < sw:
-                         try: stdscr.addch(py, px, pup_symbol, pup_attrib)
-                         except curses.error: pass
+                     frame_put(py, px, UNIFIED_POWERUP_SYMBOL, POWERUP_ATTRS.get(ptype, ATTR_DEFAULT))
 
 
             # Draw Snake (on top of everything else except flash message)
             if snake:
-                thick_attrib = curses.color_pair(DEFAULT_PAIR) if has_colors else 0 # Color for extra bits
-                drawn_thick_segments = set() # Avoid drawing extra bits multiple times per frame
-                for i, segment in enumerate(snake):
-                    seg_x, seg_y = segment
-                    # Draw main snake segment (using potentially overridden color)
-                    if 0 <= seg_y < sh and 0 <= seg_x < sw:
-                         # Avoid drawing snake body over maze walls? No, snake moves through path.
-                         try: stdscr.addch(seg_y, seg_x, SNAKE_SYMBOL, snake_attrib)
-                         except curses.error: pass
-
-                    # Draw thick part if active (based on drawing logic)
-                    if is_thick_active and i < len(snake) - 1:
-                        next_segment = snake[i+1]
-                        dx = segment[0] - next_segment[0]
-                        dy = segment[1] - next_segment[1]
-                        adj_x, adj_y = seg_x, seg_y
-                        if dx != 0: adj_y += 1 # Offset vertically if moving horizontally
-                        elif dy != 0: adj_x += 1 # Offset horizontally if moving vertically
-                        adj_pos = (adj_x, adj_y)
-
-                        # Draw only if within bounds and not already drawn this frame
-                        if adj_pos not in drawn_thick_segments:
-                            if 0 <= adj_y < sh and 0 <= adj_x < sw:
-                                 # Avoid drawing thick part on walls?
-                                 # if adj_pos not in active_maze_walls:
-                                     try:
-                                         stdscr.addch(adj_y, adj_x, THICK_SNAKE_EXTRA_SYMBOL, thick_attrib)
-                                         drawn_thick_segments.add(adj_pos)
-                                     except curses.error: pass
+                # Thick extras go down first so the body always ends up on top of them;
+                # repeated extras just rewrite the same buffered cell
+                if is_thick_active:
+                    # Pair each segment with the one behind it; deque indexing is O(n) away
+                    # from the ends, so walk it with a lagged iterator
+                    for (seg_x, seg_y), (next_x, next_y) in zip(snake, itertools.islice(snake, 1, None)):
+                        if seg_x != next_x: frame_put(seg_y + 1, seg_x, THICK_SNAKE_EXTRA_SYMBOL, ATTR_DEFAULT) # Below if moving horizontally
+                        elif seg_y != next_y: frame_put(seg_y, seg_x + 1, THICK_SNAKE_EXTRA_SYMBOL, ATTR_DEFAULT) # Right if moving vertically
+                # Draw main snake segments (using potentially overridden color)
+                for seg_x, seg_y in snake:
+                    frame_put(seg_y, seg_x, SNAKE_SYMBOL, snake_attrib)
 
 
             # Flash Message (On top of everything)
@@ -1527,17 +1750,14 @@ def main(stdscr, test_mode=False):
                 msg_len = len(flash_message)
                 msg_y = sh // 2 ; msg_x = sw // 2 - msg_len // 2
                 if msg_x < 0: msg_x = 0
-                try:
-                    if 0 <= msg_y < sh:
-                        # Ensure message doesn't exceed screen width
-                        display_msg = flash_message[:max(0, sw - 1 - msg_x)]
-                        stdscr.addstr(msg_y, msg_x, display_msg, flash_message_attrib)
-                except curses.error: pass # Ignore errors drawing message
+                # Ensure message doesn't exceed screen width
+                display_msg = flash_message[:max(0, sw - 1 - msg_x)]
+                frame_text(msg_y, msg_x, display_msg, ATTR_FLASH_MESSAGE)
             elif flash_message and current_loop_time >= flash_message_end_time:
                  flash_message = None # Clear expired message
 
 
-            stdscr.refresh()
+            if frame_flush(stdscr): stdscr.refresh() # Idle ticks leave nothing to send
         # --- End of Inner Game Loop ---
 
         # --- Game Over Sequence ---